@@ -0,0 +1,384 @@
+"""
+Jordan Pemberton
+Sudoku -- benchmarks
+"""
+
+# Times the main steps, so changes can be checked for speed as well as
+# for right answers (solver.py only checks the answers):
+#       fill                Game.fill_board(), each fill strategy
+#       start               Game.make_start_board(), each clue count
+#       solve_board         Game.solve_board(), each method, on puzzles
+#                           generated from a seed at each clue count
+#       solve               solver.solve(), each method, on the same
+#                           generated puzzles, and on tests/tests
+# Every case is run on a number of boards, and reported as the median
+# and 95th percentile time, and the median and 95th percentile of the
+# nodes and backtracks:
+#       nodes       values placed (search methods and fills),
+#                   or guesses (propagate and dlx: the same count
+#                   their max_nodes budgets use)
+#       backtracks  dead ends backed up from (search methods and
+#                   fills only, null for the others)
+# Boards come from random.seed(), seeded from --seed, the size and the
+# clue count, so the same command benchmarks the same boards on every
+# version.  Results can be written out as JSON with --output, and a
+# later run can be checked against them with --compare, which lists
+# the cases whose median time went up by more than --threshold.
+
+
+from typing import Any, Dict, List, Optional, Sequence, Text, Tuple
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+from grid import Grid
+from propagation import new_stats
+from solver import METHODS, solve
+from engine import Game
+
+# Sizes run by default (25 x 25 only with --sizes)
+DEFAULT_SIZES = (4, 9, 16)
+
+# Clue counts of the generated puzzles for each size: the game's
+# default count first, then more (fewer clues on the big boards can
+# take far too long to solve)
+CLUE_COUNTS = {
+               4:  (4, 6, 8),
+               9:  (17, 24, 30, 40),
+               16: (85, 130, 160, 200),
+               25: (350, 450, 500, 550)
+              }
+# Most boards run at the default clue counts, where one hard puzzle
+# can keep mrv or propagate searching for many seconds
+DEFAULT_CLUE_BOARDS = 3
+
+# Largest size each method is run on (row-major backtracking
+# and propagation are far too slow on the bigger boards)
+MAX_SIZES = {
+             'backtrack': 9,
+             'mrv':       25,
+             'propagate': 16,
+             'dlx':       25
+            }
+
+Result = Dict[Text, Any]
+
+
+def percentile(values: Sequence[float],
+               p: float
+              ) -> float:
+    """
+    The p-th percentile of values (nearest rank), or
+    None if there are none.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(name: Text,
+              times: List[float],
+              nodes: List[Optional[int]],
+              backtracks: List[Optional[int]]
+             ) -> Result:
+    """
+    Median and 95th percentile of the times (in ms), nodes
+    and backtracks of one case's runs.  Counts a method does
+    not keep (None) are reported as null.
+    """
+    nodes = [n for n in nodes if n is not None]
+    backtracks = [b for b in backtracks if b is not None]
+    return {
+            'name':              name,
+            'runs':              len(times),
+            'median_ms':         percentile(times, 50) * 1000,
+            'p95_ms':            percentile(times, 95) * 1000,
+            'nodes_median':      percentile(nodes, 50),
+            'nodes_p95':         percentile(nodes, 95),
+            'backtracks_median': percentile(backtracks, 50),
+            'backtracks_p95':    percentile(backtracks, 95)
+           }
+
+
+def search_counts(stats: Dict[Text, int]
+                 ) -> Tuple[Optional[int], Optional[int]]:
+    """
+    (nodes, backtracks) from the stats a solve filled in:
+    a search's own counts, or a backend's guesses.
+    """
+    if 'nodes' in stats:
+        return stats['nodes'], stats['backtracks']
+    return stats.get('guesses'), None
+
+
+def seed_random(seed: Text,
+                *parts: Any
+               ) -> None:
+    """
+    Seed the random numbers from seed and parts, so each
+    case's boards do not depend on which cases ran before.
+    """
+    random.seed(':'.join([seed] + [str(part) for part in parts]))
+
+
+def make_game(size: int,
+              clues: int
+             ) -> Game:
+    """
+    A game set up (without any input or output) to make
+    puzzles of size with clues starting tiles.
+    """
+    game = Game()
+    game.set_up_game(size, clues)
+    return game
+
+
+def bench_fill(size: int,
+               boards: int,
+               seed: Text
+              ) -> List[Result]:
+    """
+    Time fill_board() with each fill strategy it uses for
+    this size.
+    """
+    game = make_game(size, 0)
+    if size >= game.pattern_fill_min_size:
+        strategies = ('pattern',)
+    else:
+        strategies = game.fill_strategies
+    results = []
+    for strategy in strategies:
+        seed_random(seed, 'fill', size, strategy)
+        times, nodes, backtracks = [], [], []
+        for _ in range(boards):
+            start = time.perf_counter()
+            game.fill_board(strategy)
+            times.append(time.perf_counter() - start)
+            nodes.append(game.fill_stats['nodes'])
+            backtracks.append(game.fill_stats['backtracks'])
+        results.append(summarize(f'fill/{size}/{strategy}',
+                                 times, nodes, backtracks))
+    return results
+
+
+def bench_generated(size: int,
+                    clues: int,
+                    boards: int,
+                    seed: Text
+                   ) -> List[Result]:
+    """
+    Make boards puzzles of size with clues starting tiles,
+    timing make_start_board(), then time solve_board() and
+    solver.solve() on them with each method.
+    """
+    game = make_game(size, clues)
+    seed_random(seed, 'start', size, clues)
+    times = []
+    puzzles = []
+    for _ in range(boards):
+        game.solution_board = game.fill_board()
+        start = time.perf_counter()
+        puzzles.append(game.make_start_board(clues))
+        times.append(time.perf_counter() - start)
+    results = [summarize(f'start/{size}/{clues}', times, [], [])]
+
+    methods = [method for method in METHODS if size <= MAX_SIZES[method]]
+    for method in methods:
+        times, nodes, backtracks = [], [], []
+        for puzzle in puzzles:
+            board = [row[:] for row in puzzle]
+            start = time.perf_counter()
+            game.solve_board(board, method=method)
+            times.append(time.perf_counter() - start)
+            n, b = search_counts(game.solve_stats)
+            nodes.append(n)
+            backtracks.append(b)
+        results.append(summarize(f'solve_board/{size}/{clues}/{method}',
+                                 times, nodes, backtracks))
+
+    rows = [Grid.from_rows(puzzle, game.tile_values).to_rows()
+            for puzzle in puzzles]
+    results.extend(bench_solve(f'solve/{size}/{clues}', size, rows, methods))
+    return results
+
+
+def bench_solve(name: Text,
+                size: int,
+                boards: List[List[List[Optional[int]]]],
+                methods: Sequence[Text]
+               ) -> List[Result]:
+    """
+    Time solver.solve() on boards (of values) with each
+    of methods.
+    """
+    results = []
+    for method in methods:
+        times, nodes, backtracks = [], [], []
+        for clue_board in boards:
+            board = [row[:] for row in clue_board]
+            stats = new_stats()
+            start = time.perf_counter()
+            solve(size, board, 0, 0, method=method, stats=stats)
+            times.append(time.perf_counter() - start)
+            n, b = search_counts(stats)
+            nodes.append(n)
+            backtracks.append(b)
+        results.append(summarize(f'{name}/{method}', times, nodes, backtracks))
+    return results
+
+
+def bench_corpus(path: Text) -> List[Result]:
+    """
+    Time solver.solve() with each method on every puzzle
+    of a tests file, grouped by board size.
+    """
+    by_size = {}
+    with open(path) as infile:
+        for line in infile:
+            clues = line.strip().split(':')[0]
+            if clues:
+                board = Grid.from_string(clues).to_rows()
+                by_size.setdefault(len(board), []).append(board)
+    results = []
+    for size, boards in sorted(by_size.items()):
+        methods = [method for method in METHODS if size <= MAX_SIZES[method]]
+        results.extend(bench_solve(f'corpus/{size}', size, boards, methods))
+    return results
+
+
+def run(sizes: Sequence[int] =DEFAULT_SIZES,
+        boards: int =10,
+        seed: Text ='0',
+        corpus: Optional[Text] ='tests/tests',
+        log=None
+       ) -> Dict[Text, Any]:
+    """
+    Run every case for sizes (boards boards each) and the
+    puzzles in corpus (if given), returning the results with
+    a description of the run.  Each result is also written
+    to log (if given) as it finishes.
+    """
+    default_start_counts = Game().default_start_counts
+    groups = []
+    if corpus:
+        groups.append(lambda: bench_corpus(corpus))
+    for size in sizes:
+        groups.append(lambda size=size: bench_fill(size, boards, seed))
+        for clues in CLUE_COUNTS[size]:
+            count = boards
+            if clues == default_start_counts[size]:
+                count = min(boards, DEFAULT_CLUE_BOARDS)
+            groups.append(lambda size=size, clues=clues, count=count:
+                          bench_generated(size, clues, count, seed))
+    results = []
+    for group in groups:
+        for result in group():
+            results.append(result)
+            if log is not None:
+                print(format_result(result), file=log, flush=True)
+    return {
+            'meta': {
+                     'python':   platform.python_version(),
+                     'platform': platform.platform(),
+                     'sizes':    list(sizes),
+                     'boards':   boards,
+                     'seed':     seed,
+                     'corpus':   corpus
+                    },
+            'results': results
+           }
+
+
+def format_result(result: Result) -> Text:
+    """
+    One line summary of a result.
+    """
+    def count(value):
+        return '-' if value is None else str(value)
+
+    return (f"{result['name']:<32} {result['runs']:>4} runs  "
+            f"median {result['median_ms']:>9.2f} ms  "
+            f"p95 {result['p95_ms']:>9.2f} ms  "
+            f"nodes {count(result['nodes_median']):>7} / "
+            f"{count(result['nodes_p95']):<7}  "
+            f"backtracks {count(result['backtracks_median']):>6} / "
+            f"{count(result['backtracks_p95'])}")
+
+
+def compare(old: Dict[Text, Any],
+            new: Dict[Text, Any],
+            threshold: float =1.25
+           ) -> List[Tuple[Text, float, float]]:
+    """
+    Cases run in both old and new whose median time in new is
+    more than threshold times their median time in old, as
+    (name, old median, new median).
+    """
+    before = {result['name']: result for result in old['results']}
+    slower = []
+    for result in new['results']:
+        base = before.get(result['name'])
+        if base is None:
+            continue
+        if result['median_ms'] > threshold * base['median_ms']:
+            slower.append((result['name'], base['median_ms'],
+                           result['median_ms']))
+    return slower
+
+
+def main(argv: Optional[List[Text]] =None) -> None:
+    """
+    Run the benchmarks, print a line per case, and write
+    and / or compare against JSON results.
+    """
+    parser = argparse.ArgumentParser(prog='benchmark.py',
+                                     description='Time board filling, '
+                                                 'puzzle making and solving.')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(DEFAULT_SIZES),
+                        choices=sorted(CLUE_COUNTS),
+                        help='board sizes (default: 4 9 16)')
+    parser.add_argument('--boards', type=int, default=10,
+                        help='boards per case (default: 10, at most ' +
+                             str(DEFAULT_CLUE_BOARDS) +
+                             ' at the default clue counts)')
+    parser.add_argument('--seed', default='0',
+                        help='seed for the generated boards (default: 0)')
+    parser.add_argument('--corpus', default='tests/tests',
+                        help="tests file to solve, '' for none "
+                             "(default: tests/tests)")
+    parser.add_argument('--output', default=None,
+                        help='file to write the results to, as JSON')
+    parser.add_argument('--compare', default=None,
+                        help='JSON results of an earlier run: exit with '
+                             'status 1 if any case got slower')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='how many times slower (median) counts as '
+                             'slower for --compare (default: 1.25)')
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, max(1, args.boards), args.seed,
+                 args.corpus or None, sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=2)
+            outfile.write('\n')
+
+    if args.compare:
+        with open(args.compare) as infile:
+            old = json.load(infile)
+        slower = compare(old, report, args.threshold)
+        for name, before, after in slower:
+            print(f'slower: {name}  {before:.2f} ms -> {after:.2f} ms '
+                  f'({after / before:.2f}x)', file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+Jordan Pemberton
+Sudoku -- canonical forms and duplicate puzzles
+"""
+
+# Two boards are the same puzzle up to symmetry if one can be turned
+# into the other by any mix of:
+#       relabeling the values
+#       permuting the rows within a band, or the bands
+#       permuting the columns within a stack, or the stacks
+#       transposing (rows become columns)
+# canonical() maps every board in such a class to the same board, found
+# in two steps rather than by trying all ~3 million symmetries of a
+# 9 x 9 board:
+#   1.  Clue pattern.  Looking only at which cells hold a clue, find the
+#       arrangements whose pattern, read row by row, is largest (clues
+#       to the top left).  Once the order of the rows is known, the best
+#       order of the columns comes from sorting them, so only row orders
+#       are searched, one row at a time, and a partial order is dropped
+#       as soon as its rows compare lower than the best found so far.
+#   2.  Values.  Among the arrangements with the best pattern (usually
+#       only one or a few), relabel the values in order of first
+#       appearance, and keep the smallest.
+# The result is itself a board in the class, so it can be written out
+# in the usual compact string form.
+#
+# fingerprint() is far cheaper: a summary of clue counts that is the
+# same for every board in a class, but can also be the same for boards
+# in different classes.  Deduplicator only works out canonical forms
+# when two fingerprints match, so most puzzles never need one.
+
+
+from typing import Iterable, Iterator, List, Optional, Text, Tuple
+import itertools
+import math
+from grid import Grid
+from layout import layout
+
+
+def fingerprint(grid: Grid) -> Tuple:
+    """
+    Summary of a board that is the same for every board it
+    is equivalent to: clue counts of the rows (grouped by
+    band), the columns (by stack) and the zones, and how many
+    times each value appears, all in sorted order.
+    """
+    size = grid.size
+    z = math.isqrt(size)
+    cells = grid.cells
+    # Counting empty cells with bytearray.count() keeps
+    # the loops over cells out of Python
+    rows = [size - cells.count(0, r * size, r * size + size)
+            for r in range(size)]
+    cols = [size - cells[c::size].count(0) for c in range(size)]
+    # Clues in each row of each zone (row by row), then summed
+    # down the rows of each band for the zone counts
+    zz = z * z
+    pieces = [z - cells.count(0, i, i + z) for i in range(0, size * size, z)]
+    zones = [
+             sum(pieces[b + s:b + zz:z])
+             for b in range(0, size * z, zz) for s in range(z)
+            ]
+    counts = sorted(cells.count(v) for v in range(1, size + 1))
+    # Lines grouped by band (stack), then bands (stacks) sorted
+    by_row = tuple(sorted(tuple(sorted(rows[b:b + z]))
+                          for b in range(0, size, z)))
+    by_col = tuple(sorted(tuple(sorted(cols[s:s + z]))
+                          for s in range(0, size, z)))
+    # Zone counts as a band x stack table, with its rows and its
+    # columns each sorted, so band and stack order do not matter
+    table = [zones[b:b + z] for b in range(0, size, z)]
+    zone_rows = tuple(sorted(tuple(sorted(row)) for row in table))
+    zone_cols = tuple(sorted(tuple(sorted(col)) for col in zip(*table)))
+    # Transposing swaps the row and column summaries
+    lines = tuple(sorted(((by_row, zone_rows), (by_col, zone_cols))))
+    return (size, lines, tuple(counts))
+
+
+def canonical(grid: Grid) -> Grid:
+    """
+    The canonical form of a board: the same board for every
+    board it is equivalent to, and a different one otherwise.
+    Meant for puzzles; full (or nearly full) boards have many
+    equally good arrangements, and can take far longer.
+    """
+    size = grid.size
+    z = math.isqrt(size)
+    cells = grid.cells
+    # Clue pattern of each row as a bit mask over the
+    # columns, and the same for the transposed board
+    masks = [0] * size
+    masks_t = [0] * size
+    for i, v in enumerate(cells):
+        if v:
+            r, c = divmod(i, size)
+            masks[r] |= 1 << c
+            masks_t[c] |= 1 << r
+    search = PatternSearch(size, z)
+    search.run(masks, False)
+    search.run(masks_t, True)
+
+    # Smallest relabeled values among the best arrangements
+    best = None
+    for transposed, row_order, col_orders in search.leaves:
+        for col_order in col_orders:
+            labels = {}
+            seq = bytearray(size * size)
+            i = 0
+            for r in row_order:
+                for c in col_order:
+                    v = cells[c * size + r] if transposed else cells[r * size + c]
+                    if v:
+                        label = labels.get(v)
+                        if label is None:
+                            label = labels[v] = len(labels) + 1
+                        seq[i] = label
+                    i += 1
+            if best is None or seq < best:
+                best = seq
+    return Grid(size, best)
+
+
+class PatternSearch:
+    """
+    Search for the row and column orders (and transposes)
+    that make a clue pattern largest, read row by row.
+    """
+    def __init__(self,
+                 size: int,
+                 zone_size: int
+                ) -> None:
+        """
+        Start with no best pattern found.
+        """
+        self.size = size
+        self.zone_size = zone_size
+        # Rows (or columns) of each band (stack), and the
+        # band (stack) of each row (column)
+        self.bands = layout(size).bands
+        self.band_of = layout(size).band_of
+        # Best pattern so far, one row mask per row placed
+        self.best = []
+        # (transposed, row order, column orders) of each
+        # arrangement giving the best pattern
+        self.leaves = []
+
+    def run(self,
+            masks: List[int],
+            transposed: bool
+           ) -> None:
+        """
+        Search the row orders of one board (row masks over its
+        columns), adding to the best pattern and its leaves.
+        """
+        self.masks = masks
+        self.transposed = transposed
+        size = self.size
+        self.visit([], [0] * size, [0] * self.zone_size, set())
+
+    def visit(self,
+              row_order: List[int],
+              col_keys: List[int],
+              stack_keys: List[int],
+              used_bands: set
+             ) -> None:
+        """
+        Try each row that can go next.  col_keys holds each
+        column's pattern over the rows placed so far (top row
+        in the highest bit), and stack_keys each stack's rows
+        of pattern, in its best column order.
+        """
+        size = self.size
+        z = self.zone_size
+        depth = len(row_order)
+        if depth == size:
+            self.leaves.append((self.transposed, list(row_order),
+                                self.column_orders(col_keys, stack_keys)))
+            return
+        # Rest of the band in progress, or the rows of any band
+        # not started yet
+        if depth % z:
+            band = self.band_of[row_order[-1]]
+            rows = [r for r in self.bands[band] if r not in row_order]
+        else:
+            rows = [r for b, band in enumerate(self.bands)
+                    if b not in used_bands for r in band]
+        # Work out each row's pattern here, but only go on with
+        # the largest: the others can never lead to the best
+        children = []
+        empty_tried = set()
+        for r in rows:
+            mask = self.masks[r]
+            # Empty rows of one band all give the same result
+            if not mask:
+                if self.band_of[r] in empty_tried:
+                    continue
+                empty_tried.add(self.band_of[r])
+            new_cols = [
+                        key << 1 | (mask >> c & 1)
+                        for c, key in enumerate(col_keys)
+                       ]
+            # This row in each stack's best column order, then
+            # the stacks in their best order
+            new_stacks = []
+            segments = []
+            for s in range(z):
+                stack = sorted(range(s * z, s * z + z),
+                               key=new_cols.__getitem__, reverse=True)
+                segment = 0
+                for c in stack:
+                    segment = segment << 1 | (mask >> c & 1)
+                segments.append(segment)
+                new_stacks.append(stack_keys[s] << z | segment)
+            row = 0
+            for s in sorted(range(z), key=new_stacks.__getitem__,
+                            reverse=True):
+                row = row << z | segments[s]
+            children.append((row, r, new_cols, new_stacks))
+        top = max(child[0] for child in children)
+        # Compare with the best pattern so far
+        best = self.best
+        if depth < len(best):
+            if top < best[depth]:
+                return
+            if top > best[depth]:
+                del best[depth:]
+                self.leaves.clear()
+                best.append(top)
+        else:
+            best.append(top)
+        for row, r, new_cols, new_stacks in children:
+            if row != top:
+                continue
+            row_order.append(r)
+            if depth % z == 0:
+                used_bands.add(self.band_of[r])
+            self.visit(row_order, new_cols, new_stacks, used_bands)
+            if depth % z == 0:
+                used_bands.discard(self.band_of[r])
+            row_order.pop()
+
+    def column_orders(self,
+                      col_keys: List[int],
+                      stack_keys: List[int]
+                     ) -> List[List[int]]:
+        """
+        Every column order giving the best pattern for a full
+        row order: the stacks, and the columns within each,
+        sorted by their keys, with equal keys in any order
+        (except empty columns and stacks, which cannot
+        change the values either).
+        """
+        z = self.zone_size
+
+        def orders(items, key):
+            # Items sorted by key (largest first), with each
+            # run of equal keys in every order
+            groups = [
+                      list(group) for _, group in
+                      itertools.groupby(sorted(items, key=key, reverse=True),
+                                        key=key)
+                     ]
+            choices = [
+                       itertools.permutations(g) if key(g[0]) else [tuple(g)]
+                       for g in groups
+                      ]
+            for pick in itertools.product(*[list(c) for c in choices]):
+                yield [item for group in pick for item in group]
+
+        within = [
+                  list(orders(range(s * z, s * z + z), col_keys.__getitem__))
+                  for s in range(z)
+                 ]
+        result = []
+        for stack_order in orders(range(z), stack_keys.__getitem__):
+            for picks in itertools.product(*[within[s] for s in stack_order]):
+                result.append([c for cols in picks for c in cols])
+        return result
+
+
+class Deduplicator:
+    """
+    Remembers puzzles, and tells whether each new one is
+    equivalent to one seen before.
+    """
+    def __init__(self) -> None:
+        """
+        Start with no puzzles seen.
+        """
+        # By fingerprint: the first board seen with it, until
+        # a second turns up, then the set of canonical forms
+        self.classes = {}
+        self.seen = 0
+        self.unique = 0
+
+    def add(self,
+            grid: Grid
+           ) -> bool:
+        """
+        Add a board, returning True if it is not equivalent
+        to any board added before.
+        """
+        self.seen += 1
+        key = fingerprint(grid)
+        entry = self.classes.get(key)
+        if entry is None:
+            self.classes[key] = grid
+            self.unique += 1
+            return True
+        if isinstance(entry, Grid):
+            if entry == grid:
+                return False
+            entry = self.classes[key] = {canonical(entry).key()}
+        form = canonical(grid).key()
+        if form in entry:
+            return False
+        entry.add(form)
+        self.unique += 1
+        return True
+
+
+def dedup(lines: Iterable[Text],
+          deduplicator: Optional[Deduplicator] =None
+         ) -> Iterator[Text]:
+    """
+    Yield each clues[:count:solution] line whose clues are not
+    equivalent to those of an earlier line, reading lazily, so
+    any number of lines can be streamed through.
+    """
+    if deduplicator is None:
+        deduplicator = Deduplicator()
+    for line in lines:
+        clues = line.strip().split(':')[0]
+        if not clues:
+            continue
+        if deduplicator.add(Grid.from_string(clues)):
+            yield line
@@ -0,0 +1,251 @@
+"""
+Jordan Pemberton
+Sudoku -- constraint engine
+"""
+
+# Keeps one occupancy bitmask per row, column and zone, so that
+# checking a guess is a single AND instead of a scan of the board.
+#
+# Values are the integers 1..size (0 / None is an empty cell), and
+# value v is stored as bit (1 << v) in a mask.  The masks are kept up
+# to date incrementally with place() and unplace(), so a solver only
+# has to pay for the cells it actually changes.
+#
+# Cells can be given as (row, col), or as flat indexes (row * size +
+# col, as the searches use), looked up in the shared layout tables.
+
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from layout import layout
+
+
+class Constraints:
+    """
+    Row, column and zone occupancy bitmasks for one board.
+    """
+    __slots__ = ('size', 'zone_size', 'layout', 'full', 'rows', 'cols',
+                 'zones')
+
+    def __init__(self,
+                 size: int
+                ) -> None:
+        """
+        Make an empty set of masks for a board of the given size.
+        """
+        self.size = size
+        self.layout = layout(size)
+        self.zone_size = self.layout.zone_size
+        # Every value 1..size set
+        self.full = ((1 << size) - 1) << 1
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.zones = [0] * size
+
+    @classmethod
+    def from_board(cls,
+                   size: int,
+                   board: List[List[Any]],
+                   values: Optional[Dict[Any, int]] =None
+                  ) -> 'Constraints':
+        """
+        Build the masks for a board (None or 0 for an empty cell).
+        If given, values maps each tile on the board to its
+        value 1..size, otherwise tiles are taken to be ints.
+        """
+        constraints = cls(size)
+        for row in range(size):
+            for col in range(size):
+                tile = board[row][col]
+                if tile:
+                    value = values[tile] if values is not None else tile
+                    constraints.place(row, col, value)
+        return constraints
+
+    def zone_of(self,
+                row: int,
+                col: int
+               ) -> int:
+        """
+        Index of the zone containing (row, col).
+        """
+        return self.layout.zone_at[row][col]
+
+    def place(self,
+              row: int,
+              col: int,
+              value: int
+             ) -> None:
+        """
+        Mark value as used in the row, column and zone of (row, col).
+        """
+        bit = 1 << value
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.zones[self.layout.zone_at[row][col]] |= bit
+
+    def unplace(self,
+                row: int,
+                col: int,
+                value: int
+               ) -> None:
+        """
+        Undo place(): mark value as free again in the
+        row, column and zone of (row, col).
+        """
+        bit = ~(1 << value)
+        self.rows[row] &= bit
+        self.cols[col] &= bit
+        self.zones[self.layout.zone_at[row][col]] &= bit
+
+    def used(self,
+             row: int,
+             col: int
+            ) -> int:
+        """
+        Mask of every value already used by the peers of (row, col).
+        """
+        return (self.rows[row] |
+                self.cols[col] |
+                self.zones[self.layout.zone_at[row][col]])
+
+    def is_valid(self,
+                 row: int,
+                 col: int,
+                 value: int
+                ) -> bool:
+        """
+        Check if value can go in the (empty) cell at (row, col).
+        """
+        return not self.used(row, col) & (1 << value)
+
+    def candidates_mask(self,
+                        row: int,
+                        col: int
+                       ) -> int:
+        """
+        Mask of every value that can still go in (row, col).
+        """
+        return self.full & ~self.used(row, col)
+
+    def candidates(self,
+                   row: int,
+                   col: int
+                  ) -> Iterator[int]:
+        """
+        Values that can still go in (row, col), smallest first.
+        """
+        return iter_values(self.candidates_mask(row, col))
+
+    def candidates_at(self,
+                      cell: int
+                     ) -> int:
+        """
+        Mask of every value that can still go in the
+        cell with flat index cell.
+        """
+        tables = self.layout
+        return self.full & ~(self.rows[tables.row_of[cell]] |
+                             self.cols[tables.col_of[cell]] |
+                             self.zones[tables.zone_of[cell]])
+
+    def filled_peers(self,
+                     cell: int
+                    ) -> int:
+        """
+        How many filled cells share the row, column or zone
+        of the cell with flat index cell.  The fewer filled,
+        the more empty peers the cell constrains (its degree
+        is higher).
+        """
+        tables = self.layout
+        return (self.rows[tables.row_of[cell]].bit_count() +
+                self.cols[tables.col_of[cell]].bit_count() +
+                self.zones[tables.zone_of[cell]].bit_count())
+
+    def most_constrained(self,
+                         cells: List[int]
+                        ) -> Tuple[int, int]:
+        """
+        Pick where to branch next on a board with the given
+        empty cells (flat indexes), returning the place of a
+        cell in cells and the mask of values to try there.
+        A mask of 0 means the board is a dead end.
+
+        The cell with the fewest candidates is chosen (MRV),
+        with ties going to the cell with the most empty peers
+        (degree).  Counting the other way round too, a value
+        with nowhere left to go in some row, column or zone is
+        a dead end, and a value with only one place left in a
+        unit is forced there, like a cell with one candidate.
+        """
+        size = self.size
+        rows, cols, zones = self.rows, self.cols, self.zones
+        row_of, col_of, zone_of = (self.layout.row_of, self.layout.col_of,
+                                   self.layout.zone_of)
+        # Values seen at least once / at least twice among
+        # the candidates of each row, column and zone
+        once = [[0] * size for _ in range(3)]
+        twice = [[0] * size for _ in range(3)]
+        masks = []
+        best = 0
+        best_mask = 0
+        best_count = size + 1
+        best_filled = None
+        for i, cell in enumerate(cells):
+            row, col, zone = row_of[cell], col_of[cell], zone_of[cell]
+            mask = self.full & ~(rows[row] | cols[col] | zones[zone])
+            # Dead end, no need to look further
+            if not mask:
+                return i, mask
+            masks.append(mask)
+            for unit, k in enumerate((row, col, zone)):
+                twice[unit][k] |= once[unit][k] & mask
+                once[unit][k] |= mask
+            count = mask.bit_count()
+            if count < best_count:
+                best, best_mask, best_count = i, mask, count
+                best_filled = None
+            elif count == best_count and count > 1:
+                # Tie, compare degrees (only computed when needed)
+                if best_filled is None:
+                    best_filled = self.filled_peers(cells[best])
+                filled = self.filled_peers(cell)
+                if filled < best_filled:
+                    best, best_mask, best_filled = i, mask, filled
+        # Forced cell
+        if best_count <= 1:
+            return best, best_mask
+        # Look for values with no place, or one place, in a unit
+        for unit, placed, unit_of in ((0, rows, row_of), (1, cols, col_of),
+                                      (2, zones, zone_of)):
+            for k in range(size):
+                missing = self.full & ~placed[k]
+                if missing & ~once[unit][k]:
+                    return best, 0
+                single = missing & once[unit][k] & ~twice[unit][k]
+                if single:
+                    bit = single & -single
+                    for i, cell in enumerate(cells):
+                        if unit_of[cell] == k and masks[i] & bit:
+                            return i, bit
+        return best, best_mask
+
+    def is_complete(self) -> bool:
+        """
+        Check if every row, column and zone holds every value.
+        For a full board, this means the board is solved.
+        """
+        full = self.full
+        return (all(mask == full for mask in self.rows) and
+                all(mask == full for mask in self.cols) and
+                all(mask == full for mask in self.zones))
+
+
+def iter_values(mask: int) -> Iterator[int]:
+    """
+    Values whose bits are set in mask, smallest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,352 @@
+"""
+Jordan Pemberton
+Sudoku -- Dancing Links solver
+"""
+
+# Knuth's Algorithm X with Dancing Links (DLX).
+#
+# Sudoku as an exact cover problem: every (cell, value) choice is a
+# row that covers four columns, one from each group of size * size:
+#       cell        (row, col) holds some value
+#       row-value   row holds value
+#       col-value   col holds value
+#       zone-value  zone holds value
+# A solution is a set of rows covering every column exactly once.
+#
+# Columns already covered by the clues are left out of the matrix,
+# as are rows that clash with a clue, so the matrix only holds the
+# part of the board that is still open.  The links live in flat lists
+# (L, R, U, D, C) indexed by node, with node 0 as the root header, in
+# a Links object made fresh for each board.
+#
+# Every search can be given a node budget (rows chosen) and a deadline
+# (a time.perf_counter() time); running past either raises TimeoutError.
+
+
+from typing import Any, Dict, Iterator, List, Optional, Text
+from constraints import Constraints
+from layout import layout
+from probe import Probe
+from search import CLOCK_EVERY
+import time
+
+
+class DancingLinks:
+    """
+    Exact cover solver for boards of one size.
+    """
+    def __init__(self,
+                 size: int
+                ) -> None:
+        """
+        Set the board size and zone size.
+        """
+        self.size = size
+        self.layout = layout(size)
+        self.zone_size = self.layout.zone_size
+
+    def columns_of(self,
+                   row: int,
+                   col: int,
+                   value: int
+                  ) -> List[int]:
+        """
+        The four constraint columns covered by value at (row, col).
+        """
+        n = self.size
+        zone = self.layout.zone_at[row][col]
+        v = value - 1
+        return [
+                row * n + col,
+                n * n + row * n + v,
+                2 * n * n + col * n + v,
+                3 * n * n + zone * n + v
+               ]
+
+    def build(self,
+              board: List[List[Any]],
+              values: Optional[Dict[Any, int]] =None
+             ) -> Optional['Links']:
+        """
+        Build the links for the open part of a board (None or 0
+        for an empty cell).  If given, values maps each tile on
+        the board to its value 1..size, otherwise tiles are ints.
+        Return None if the clues already clash.
+        """
+        n = self.size
+        # Columns covered by the clues
+        covered = set()
+        for row in range(n):
+            for col in range(n):
+                tile = board[row][col]
+                if tile:
+                    value = values[tile] if values is not None else tile
+                    for column in self.columns_of(row, col, value):
+                        if column in covered:
+                            return None
+                        covered.add(column)
+        constraints = Constraints.from_board(n, board, values)
+
+        # Headers: root (node 0), then one per open column
+        header = {}
+        links = Links()
+        for column in range(4 * n * n):
+            if column in covered:
+                continue
+            node = len(links.L)
+            header[column] = node
+            links.L.append(node - 1)
+            links.R.append(0)
+            links.R[node - 1] = node
+            links.L[0] = node
+            links.U.append(node)
+            links.D.append(node)
+            links.C.append(node)
+            links.S.append(0)
+            links.choice.append(None)
+
+        # One row per value that can still go in each empty cell
+        for row in range(n):
+            for col in range(n):
+                if board[row][col]:
+                    continue
+                for value in constraints.candidates(row, col):
+                    first = None
+                    for column in self.columns_of(row, col, value):
+                        c = header[column]
+                        node = len(links.L)
+                        # Link in at the bottom of the column
+                        links.U.append(links.U[c])
+                        links.D.append(c)
+                        links.D[links.U[c]] = node
+                        links.U[c] = node
+                        links.C.append(c)
+                        links.S[c] += 1
+                        links.S.append(0)
+                        links.choice.append((row * n + col, value))
+                        # Link in at the end of the row
+                        if first is None:
+                            first = node
+                            links.L.append(node)
+                            links.R.append(node)
+                        else:
+                            links.L.append(links.L[first])
+                            links.R.append(first)
+                            links.R[links.L[first]] = node
+                            links.L[first] = node
+        return links
+
+    def solutions(self,
+                  board: List[List[Any]],
+                  values: Optional[Dict[Any, int]] =None,
+                  stats: Optional[Dict[Text, int]] =None,
+                  max_nodes: Optional[int] =None,
+                  deadline: Optional[float] =None,
+                  probe: Optional[Probe] =None
+                 ) -> Iterator[Dict[int, int]]:
+        """
+        Yield each solution of a board, as a dict of
+        {flat cell index: value} for the empty cells.
+        max_nodes, deadline and probe are as for Links.search().
+        """
+        links = self.build(board, values)
+        if links is None:
+            return
+        for chosen in links.search(stats, max_nodes, deadline, probe):
+            yield dict(links.choice[node] for node in chosen)
+
+    def count(self,
+              board: List[List[Any]],
+              limit: Optional[int] =None,
+              values: Optional[Dict[Any, int]] =None,
+              stats: Optional[Dict[Text, int]] =None,
+              max_nodes: Optional[int] =None,
+              deadline: Optional[float] =None,
+              probe: Optional[Probe] =None
+             ) -> int:
+        """
+        Count the solutions of a board, stopping early once
+        limit (if given) is reached.  A limit of 2 is enough
+        to tell if a board has exactly one solution.
+        max_nodes, deadline and probe are as for Links.search().
+        """
+        links = self.build(board, values)
+        if links is None:
+            return 0
+        count = 0
+        for _ in links.search(stats, max_nodes, deadline, probe):
+            count += 1
+            if limit is not None and count >= limit:
+                break
+        return count
+
+    def solve(self,
+              board: List[List[Any]],
+              stats: Optional[Dict[Text, int]] =None,
+              values: Optional[Dict[Any, int]] =None,
+              max_nodes: Optional[int] =None,
+              deadline: Optional[float] =None,
+              probe: Optional[Probe] =None
+             ) -> bool:
+        """
+        Solve a board in place, returning True if solved.
+        If given, values maps tiles to values, and solved
+        cells are filled with the matching tiles.
+        max_nodes, deadline and probe are as for Links.search()
+        (the board is left as it was on a TimeoutError).
+        """
+        for solution in self.solutions(board, values, stats, max_nodes,
+                                       deadline, probe):
+            tiles = None
+            if values is not None:
+                tiles = {value: tile for tile, value in values.items()}
+            row_of, col_of = self.layout.row_of, self.layout.col_of
+            for i, value in solution.items():
+                board[row_of[i]][col_of[i]] = (
+                    tiles[value] if tiles is not None else value
+                )
+            return True
+        return False
+
+
+class Links:
+    """
+    The linked nodes of one exact cover matrix, and the
+    search over them.  Each build() makes its own Links,
+    so one DancingLinks can work on several boards at once.
+    """
+    __slots__ = ('L', 'R', 'U', 'D', 'C', 'S', 'choice')
+
+    def __init__(self) -> None:
+        """
+        Start with just the root header (node 0).
+        """
+        self.L = [0]
+        self.R = [0]
+        self.U = [0]
+        self.D = [0]
+        self.C = [0]
+        self.S = [0]
+        # (cell index, value) of the row each node belongs to
+        self.choice = [None]
+
+    def cover(self,
+              c: int
+             ) -> None:
+        """
+        Take column c out of the header list, and every row
+        that meets c out of the other columns it covers.
+        """
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[c]] = L[c]
+        R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self,
+                c: int
+               ) -> None:
+        """
+        Undo cover(c), relinking in exactly the reverse order.
+        """
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c
+        R[L[c]] = c
+
+    def search(self,
+               stats: Optional[Dict[Text, int]] =None,
+               max_nodes: Optional[int] =None,
+               deadline: Optional[float] =None,
+               probe: Optional[Probe] =None
+              ) -> Iterator[List[int]]:
+        """
+        Run Algorithm X over the built links, yielding the
+        row nodes of each exact cover found.  Iterative, with
+        an explicit stack of chosen rows, so deep boards do
+        not hit the recursion limit.  Raise TimeoutError once
+        more than max_nodes guesses have been made (rows chosen
+        from a column with more than one row left, the same
+        budget as the propagate backend's), or once deadline
+        (a time.perf_counter() time) has passed.
+        probe (if given) counts the columns branched on
+        (calls), rows chosen (placements) and dead ends.
+        """
+        R, D, C, S = self.R, self.D, self.C, self.S
+        chosen = []
+        nodes = 0
+        guesses = 0
+        while True:
+            # Every column covered: a solution
+            if R[0] == 0:
+                yield chosen
+                r = None
+            else:
+                # Column with the fewest rows left
+                c = best = R[0]
+                while c != 0:
+                    if S[c] < S[best]:
+                        best = c
+                    if S[best] <= 1:
+                        break
+                    c = R[c]
+                # More than one row to try: a guess
+                guess = S[best] > 1
+                self.cover(best)
+                r = D[best]
+                if probe is not None:
+                    probe.calls += 1
+                if r == best:
+                    # Nothing left to try for this column
+                    self.uncover(best)
+                    r = None
+                    if probe is not None:
+                        probe.backtracks += 1
+            # Back up until some row has an untried sibling
+            while r is None:
+                if not chosen:
+                    return
+                r = chosen.pop()
+                j = self.L[r]
+                while j != r:
+                    self.uncover(C[j])
+                    j = self.L[j]
+                c = C[r]
+                r = D[r]
+                if r == c:
+                    self.uncover(c)
+                    r = None
+                guess = True
+            # Choose row r
+            if guess:
+                guesses += 1
+                if stats is not None:
+                    stats['guesses'] = stats.get('guesses', 0) + 1
+                if max_nodes is not None and guesses > max_nodes:
+                    raise TimeoutError(f'search passed {max_nodes} guesses')
+            nodes += 1
+            if (deadline is not None and not nodes % CLOCK_EVERY and
+                    time.perf_counter() >= deadline):
+                raise TimeoutError('search passed its deadline')
+            chosen.append(r)
+            if probe is not None:
+                probe.node(self, len(chosen))
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
@@ -0,0 +1,1107 @@
+"""
+Jordan Pemberton
+Sudoku -- engine
+"""
+
+# Everything needed to make, solve and play puzzles, with no input or
+# output: importing this module or making a Game never prompts, prints
+# or starts a game, so services can use it without a terminal session
+# (sudoku.py is the terminal game, a thin layer of prompts and
+# printing over Game).  For most uses the two functions are enough:
+#       generate(size, clues, seed)     a puzzle and its solution
+#       solve(board)                    a solved copy of a board
+# Boards given to and from them hold ints 1..size, with None for an
+# empty cell.  Nothing is worked out before it is first needed: the
+# tables for a board size (layout.py) are made the first time a board
+# of that size is used, and the solvers are only imported here, not
+# the argument parsing the command lines need.  Batches of puzzles in
+# the clues:count:solution format of tests/tests, across worker
+# processes if wanted, are made here too (generate_batch()), for
+# sudoku.py's generate command.
+
+
+from typing import Dict, List, Optional, Text, Tuple, Union
+import multiprocessing
+import random
+import string
+import sys
+import time
+from constraints import Constraints, iter_values
+from dlx import DancingLinks
+from grading import BANDS, Grader
+from grid import SYMBOLS, Grid
+from hints import Hinter
+from layout import layout
+from playstate import PlayState
+from probe import Probe
+from propagation import Propagator, new_stats
+from search import Search, ZoneSearch, luby
+
+Board = List[List[Optional[Text]]]
+# (row, col, tile, technique) of a hint
+Hint = Tuple[int, int, Text, Text]
+
+# Solver backends, each built with a board size and
+# solving with solve(board, stats=None, values=None):
+#       propagate   constraint propagation, then guessing
+#       dlx         Dancing Links exact cover
+BACKENDS = {
+            'propagate': Propagator,
+            'dlx': DancingLinks
+           }
+
+# Backends made so far for solve(), by (method, size)
+_solvers = {}
+
+
+class Game:
+    """
+    A Sudoku game: its boards, and everything that makes,
+    solves and plays them, with no input or output.
+    """
+    def __init__(self,
+                 rng: Optional[random.Random] =None
+                ) -> None:
+        """
+        Set defaults (call set_up_game() and make_boards() to
+        make a puzzle).  Random numbers come from rng if given,
+        otherwise from the random module (so random.seed()
+        repeats them).
+        """
+        self.random = rng if rng is not None else random
+        self.default_tile_set = 'N'
+        self.default_size = 9
+        self.default_unique = False
+        self.default_difficulty = None
+        self.valid_sizes = {
+                            4:  2,
+                            9:  3,
+                            16: 4,
+                            25: 5,
+                            36: 6
+                           }
+        self.default_start_counts = {
+                                     4 : 4,     # known min start
+                                     9 : 17,    # known min start
+                                     16: 85,    # unknown min start
+                                                # (smaller nums take longer)
+                                     25: 350,   # unknown min start
+                                     36: 800    # unknown min start
+                                    }
+        # Fewest starting tiles a player can ask for in a puzzle with
+        # one solution: about the fewest make_unique_start_board()
+        # reaches inside the terminal game's 30 second limit (a few
+        # seconds at most for 4 x 4 and 9 x 9, up to about 20 for
+        # the rest), rounded up.  Puzzles with more solutions can
+        # have any number.
+        self.min_start_counts = {
+                                 4 : 4,
+                                 9 : 22,
+                                 16: 90,
+                                 25: 280,
+                                 36: 700
+                                }
+        # Boards this big are filled from a shuffled pattern,
+        # as searching for a solution takes too long
+        self.pattern_fill_min_size = 25
+        # How fill_board() fills smaller boards: 'mrv' (most
+        # constrained cell first), 'zones' (zone by zone) or
+        # 'pattern' (a shuffled pattern, no search)
+        self.fill_strategies = ('mrv', 'zones', 'pattern')
+        self.fill_strategy = 'mrv'
+        # When fill_board() gives up on a try and starts over with
+        # new starter zones: 'luby' (after luby(k) x 4 x size x size
+        # nodes on the k-th try, so a bad start can never run on
+        # and on) or None (mrv: only once the starter zones are
+        # shown not to work, zones: after 4 x size x size nodes)
+        self.restart_strategies = ('luby', None)
+        self.restart_strategy = 'luby'
+        # Puzzles made for a difficulty band that grade
+        # differently are thrown away, up to this many times
+        self.max_difficulty_tries = 200
+        # Removal passes make_unique_start_board() makes before
+        # giving up on the number of starting tiles asked for
+        self.unique_passes = 100
+        # Guesses allowed for each uniqueness check while removing
+        # tiles: a board that needs more is treated as having more
+        # than one solution (the tile goes back), which keeps every
+        # check quick on sparse 16 x 16 boards
+        self.unique_check_guesses = 50
+        # Counts what the searches do, if set to a Probe (see
+        # probe.py); None (the default) turns counting off
+        self.probe = None
+
+    def set_up_game(self,
+                    size: int,
+                    how_many_start_tiles: int,
+                    tile_set: Text ='N',
+                    unique: bool =False,
+                    difficulty: Optional[Text] =None
+                   ) -> None:
+        """
+        Set the size, number of starting tiles, tile set,
+        uniqueness and difficulty band (None for any) of a
+        game, and make the tiles, zone size, solver backends,
+        grader and empty_board to go with them.
+        """
+        if difficulty is not None and difficulty not in BANDS:
+            raise ValueError('difficulty must be one of ' +
+                             ', '.join(BANDS))
+        self.size = size
+        self.how_many_start_tiles = how_many_start_tiles
+        self.tile_set = tile_set
+        self.unique = unique
+        self.difficulty = difficulty
+
+        # Make your set of tiles
+        self.tiles = self.make_tile_set()
+        # Value (1..size) of each tile, used by the constraint masks
+        self.tile_values = {tile: i + 1 for i, tile in enumerate(self.tiles)}
+
+        # Determine correct zone size
+        self.zone_size = self.valid_sizes[self.size]
+        # Row, column and zone of each flat cell index (shared
+        # by every game and search of this size)
+        self.layout = layout(self.size)
+
+        # Solver backends for this size, and what the last solve did
+        self.backends = {
+                         method: backend(self.size)
+                         for method, backend in BACKENDS.items()
+                        }
+        self.solve_stats = new_stats()
+        # What the last fill_board() did: values placed and
+        # dead ends backed up from over all of its attempts,
+        # and how many times it started over
+        self.fill_stats = {'nodes': 0, 'backtracks': 0, 'restarts': 0}
+        # Technique ladder grader, and the grade of the last puzzle
+        # made for a band: (hardest technique, band, score)
+        self.grader = Grader(self.size)
+        self.grade = None
+        # Finds logical next moves for hint()
+        self.hinter = Hinter(self.size)
+
+        # Make an empty board
+        self.empty_board = [
+                            [None for i in range(self.size)]
+                            for j in range(self.size)
+                           ]
+
+        # Boards of the puzzle (made by make_boards())
+        self.solution_board = None
+        self.starting_board = None
+        self.playing_board = None
+        # Empty cells on playing board (determined when starting board is made)
+        self.playing_board_empties = set([i for i in range(self.size)])
+        # Flat indexes of the starting tiles
+        self.starting_cells = frozenset()
+        # Tile counts and conflicts of the playing board (made
+        # with it, and kept up to date by every move)
+        self.play_state = None
+        # Cached for hint(): a solution keeping every tile on the
+        # playing board (None until needed, or once a move goes
+        # against it), and the last hint (None after any move)
+        self.hint_solution = None
+        self.last_hint = None
+
+    def make_boards(self,
+                    timeout: Optional[float] =None,
+                    max_nodes: Optional[int] =None
+                   ) -> None:
+        """
+        Make a new solution_board, starting_board and
+        playing_board for the game that is set up.  With a
+        difficulty band, keep making and grading puzzles until
+        one grades in that band (its grade kept in self.grade),
+        raising RuntimeError after max_difficulty_tries.  Puzzles
+        for any band but extreme are unique, even if unique is
+        off.  A unique puzzle that cannot be brought down to
+        how_many_start_tiles also raises RuntimeError (see
+        make_unique_start_board()).  Raise TimeoutError if it
+        takes more than timeout seconds (grading included), or
+        if filling a solution board takes more than max_nodes
+        nodes (if given).  Either error leaves the boards of the
+        last puzzle made (if any) as they were.
+        Required:  set_up_game() must be called first.
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.perf_counter() + timeout
+        # A puzzle the ladder solves without guessing has only one
+        # solution, so for any band but extreme, make unique puzzles
+        # (one with more solutions could only ever grade extreme)
+        unique = self.unique or self.difficulty not in (None, 'extreme')
+        # Put back if no puzzle is made
+        kept = (self.solution_board, self.starting_board,
+                self.playing_board_empties, self.grade)
+        try:
+            for _ in range(self.max_difficulty_tries):
+                # Answer board
+                self.solution_board = self.fill_board(max_nodes=max_nodes,
+                                                      deadline=deadline)
+
+                # Starting puzzle board
+                self.starting_board = self.make_start_board(
+                                          self.how_many_start_tiles,
+                                          unique,
+                                          deadline
+                                         )
+                if self.difficulty is None:
+                    break
+                self.grade = self.grader.grade(self.starting_board,
+                                               self.tile_values,
+                                               deadline=deadline)
+                if self.grade[1] == self.difficulty:
+                    break
+                if self.probe is not None:
+                    self.probe.retry('make_boards')
+            else:
+                raise RuntimeError('no ' + self.difficulty + ' puzzle with ' +
+                                   str(self.how_many_start_tiles) +
+                                   ' starting tiles in ' +
+                                   str(self.max_difficulty_tries) + ' tries')
+        except (RuntimeError, TimeoutError):
+            (self.solution_board, self.starting_board,
+             self.playing_board_empties, self.grade) = kept
+            raise
+        # Playing board
+        self.playing_board = [row[:] for row in self.starting_board]
+        self.starting_cells = frozenset(
+                                        i
+                                        for i in range(self.size * self.size)
+                                        if i not in self.playing_board_empties
+                                       )
+        self.play_state = PlayState(self.size, self.playing_board,
+                                    self.tile_values)
+        self.hint_solution = None
+        self.last_hint = None
+
+    def make_tile_set(self) -> List[Text]:
+        """
+        Make a set of tiles (letters, numbers or
+        symbols) that is the correct length (self.size).
+        """
+        # Using alpha letters
+        if self.tile_set.upper() == 'L':
+            tiles_itr = string.ascii_uppercase
+            if self.size > len(tiles_itr):
+                raise ValueError('only ' + str(len(tiles_itr)) +
+                                 ' letter tiles, use numbers or symbols')
+        # Using one character symbols, as in the compact strings
+        elif self.tile_set.upper() == 'S':
+            tiles_itr = SYMBOLS
+        # Using numerals (default)
+        else:
+            tiles_itr = [str(i) for i in range(1, self.size + 1)]
+        # Crop to match size, return set
+        return list(tiles_itr[:self.size])
+
+    def new_empty_board(self) -> Board:
+        """
+        Make a new empty board of the current size.
+        """
+        return [[None] * self.size for _ in range(self.size)]
+
+    def place_tile(self,
+                   board: Board,
+                   constraints: Constraints,
+                   row: int,
+                   col: int,
+                   value: int,
+                   trail: Optional[List[Tuple[int, int, int]]] =None
+                  ) -> None:
+        """
+        Put the tile for value on board at (row, col), update
+        its masks, and (if given) record the move on trail.
+        """
+        board[row][col] = self.tiles[value - 1]
+        constraints.place(row, col, value)
+        if trail is not None:
+            trail.append((row, col, value))
+
+    def undo_trail(self,
+                   board: Board,
+                   constraints: Constraints,
+                   trail: List[Tuple[int, int, int]]
+                  ) -> None:
+        """
+        Take back every move recorded on trail, newest first,
+        leaving board and masks as they were before the moves.
+        """
+        while trail:
+            row, col, value = trail.pop()
+            board[row][col] = None
+            constraints.unplace(row, col, value)
+
+    def get_zone_order(self) -> List[Tuple[int, int]]:
+        """
+        Determine the order in which to fill zones, as (zone
+        row, zone col) pairs: the two starter corner zones, then
+        working out from them, along the outer sides and across
+        the corner-corner diagonal, each zone once.
+        (Used with fill_board_by_zones.)
+        """
+        order = []
+        end = self.zone_size
+        for i in range(end):
+            ring = [(i, i), (end - i - 1, end - i - 1)]
+            for j in range(i):
+                ring.append((i, j))
+                ring.append((j, i))
+                ring.append((end - i - 1, end - j - 1))
+                ring.append((end - j - 1, end - i - 1))
+            for zone in ring:
+                if zone not in order:
+                    order.append(zone)
+        return order
+
+    def fill_board_by_zones(self,
+                            max_nodes: Optional[int] =None,
+                            deadline: Optional[float] =None
+                           ) -> Board:
+        """
+        Make a new board filled with a valid solution, filling
+        zones working out from the two starter corner zones (see
+        get_zone_order()), so a zone only ever has to fit the
+        zones next to it that are already filled.  Within a zone
+        the most constrained cell goes first, and the values
+        allowed in each of the zone's rows and columns are worked
+        out once per step (see search.ZoneSearch).  Forced cells
+        anywhere on the board are filled straight away, and a
+        zone that cannot be completed backs up into the zones
+        before it.  If the search gets stuck, it starts over with
+        new starter zones.  Called by fill_board() ('zones' strategy),
+        with its max_nodes and deadline.
+        """
+        zone_order = [
+                      z_row * self.zone_size + z_col
+                      for z_row, z_col in self.get_zone_order()
+                     ]
+        # Most starts fill in a few hundred steps, but a few get
+        # stuck for far longer, so give up on those and start over
+        stuck_nodes = 4 * self.size * self.size
+        board = self.new_empty_board()
+        constraints = Constraints(self.size)
+        solvable = False
+        attempt = 0
+        while not solvable:
+            budget = self.restart_budget(attempt, stuck_nodes, max_nodes,
+                                         deadline)
+            # Start by filling two opposite zones
+            trail = self.fill_two_starter_zones(board, constraints)
+            # Fill (solve) the rest, zone by zone
+            search = ZoneSearch(self.size, board, zone_order[2:],
+                                constraints, tiles=self.tiles,
+                                probe=self.probe)
+            solvable = search.run(budget, deadline)
+            self.fill_stats['nodes'] += search.nodes
+            self.fill_stats['backtracks'] += search.backtracks
+            # Not solvable (or stuck), take back the starter zones
+            if not solvable:
+                self.fill_stats['restarts'] += 1
+                if self.probe is not None:
+                    self.probe.retry('fill_board_by_zones')
+                search.unwind()
+                self.undo_trail(board, constraints, trail)
+            attempt += 1
+        return board
+
+    def fill_board(self,
+                   strategy: Optional[Text] =None,
+                   max_nodes: Optional[int] =None,
+                   deadline: Optional[float] =None
+                  ) -> Board:
+        """
+        Make a new board filled with a valid solution.
+        Starts by filling two started zones, and then
+        searches (most constrained cell first) to fill the
+        remainder, starting over as self.restart_strategy says.
+        A failed attempt is undone in place, rather than
+        starting again from a copy of the empty board.
+        With the 'zones' strategy (self.fill_strategy if not
+        given), call fill_board_by_zones() instead, and with the
+        'pattern' strategy, fill_board_pattern() (no search).
+        Raise TimeoutError once max_nodes nodes (over all tries)
+        have been used, or once deadline (a time.perf_counter()
+        time) has passed.
+        """
+        if strategy is None:
+            strategy = self.fill_strategy
+        self.fill_stats = {'nodes': 0, 'backtracks': 0, 'restarts': 0}
+        # Too big to search, shuffle a pattern instead
+        if strategy == 'pattern' or self.size >= self.pattern_fill_min_size:
+            return self.fill_board_pattern()
+        if strategy == 'zones':
+            return self.fill_board_by_zones(max_nodes, deadline)
+        board = self.new_empty_board()
+        constraints = Constraints(self.size)
+        solvable = False
+        attempt = 0
+        while not solvable:
+            budget = self.restart_budget(attempt, None, max_nodes, deadline)
+            # Start by filling two opposite zones
+            trail = self.fill_two_starter_zones(board, constraints)
+
+            # Fill (solve) the rest of the board
+            search = Search(self.size, board, constraints, mrv=True,
+                            tiles=self.tiles, probe=self.probe)
+            solvable = search.run(budget, deadline)
+            self.fill_stats['nodes'] += search.nodes
+            self.fill_stats['backtracks'] += search.backtracks
+
+            # Not solvable (or out of nodes), take back the starter zones
+            if not solvable:
+                self.fill_stats['restarts'] += 1
+                if self.probe is not None:
+                    self.probe.retry('fill_board')
+                search.unwind()
+                self.undo_trail(board, constraints, trail)
+            attempt += 1
+
+        # Board is solvable and filled, return it
+        return board
+
+    def restart_budget(self,
+                       attempt: int,
+                       default: Optional[int],
+                       max_nodes: Optional[int] =None,
+                       deadline: Optional[float] =None
+                      ) -> Optional[int]:
+        """
+        Nodes that try number attempt (from 0) at filling a
+        board may use before starting over: luby(attempt + 1)
+        x 4 x size x size with the 'luby' restart strategy, else
+        default (None for no limit), and never more than is
+        left of max_nodes (the budget for all tries, if given).
+        Raise TimeoutError if max_nodes is used up, or deadline
+        has passed.
+        """
+        if deadline is not None and time.perf_counter() >= deadline:
+            raise TimeoutError('no solution board filled in time (tries: ' +
+                               str(attempt) + ')')
+        budget = default
+        if self.restart_strategy == 'luby':
+            budget = luby(attempt + 1) * 4 * self.size * self.size
+        if max_nodes is not None:
+            left = max_nodes - self.fill_stats['nodes']
+            if left <= 0:
+                raise TimeoutError('no solution board filled in ' +
+                                   str(max_nodes) + ' nodes (tries: ' +
+                                   str(attempt) + ')')
+            budget = left if budget is None else min(budget, left)
+        return budget
+
+    def fill_board_pattern(self) -> Board:
+        """
+        Make a new board filled with a valid solution, without
+        searching.  Starts from the pattern solution where each
+        row is the row above shifted along by one zone (and each
+        band by one more), then shuffles the bands, the rows
+        within each band, the stacks, the columns within each
+        stack, and the tiles, and flips the board about its
+        diagonal half of the time.  None of these can break a
+        row, column or zone, so every result is valid.
+        Called by fill_board() for large boards, or for any
+        size with the 'pattern' strategy.
+        """
+        size = self.size
+        z = self.zone_size
+        # Shuffled bands, and shuffled rows within each band
+        rows = [
+                band * z + r
+                for band in self.random.sample(range(z), z)
+                for r in self.random.sample(range(z), z)
+               ]
+        # Shuffled stacks, and shuffled columns within each stack
+        cols = [
+                stack * z + c
+                for stack in self.random.sample(range(z), z)
+                for c in self.random.sample(range(z), z)
+               ]
+        # Shuffled tiles
+        tiles = self.random.sample(self.tiles, size)
+        board = [
+                 [tiles[(z * (r % z) + r // z + c) % size] for c in cols]
+                 for r in rows
+                ]
+        # Transpose (rows become columns)
+        if self.random.random() < 0.5:
+            board = [list(col) for col in zip(*board)]
+        return board
+
+    def fill_two_starter_zones(self,
+                               board: Board,
+                               constraints: Constraints
+                              ) -> List[Tuple[int, int, int]]:
+        """
+        Fill the first two corner zones on board, which have
+        no shared rows or columns.
+        Return the trail of moves made, for undo_trail().
+        Called by fill_board().
+        """
+        trail = []
+        # Fill top left zone
+        start = 0
+        end = self.zone_size
+        self.fill_starter_zone(start, end, board, constraints, trail)
+
+        # Fill bottom right zone
+        start = self.size - self.zone_size
+        end = self.size
+        self.fill_starter_zone(start, end, board, constraints, trail)
+        return trail
+
+    def fill_starter_zone(self,
+                          start: int,
+                          end: int,
+                          board: Board,
+                          constraints: Constraints,
+                          trail: Optional[List[Tuple[int, int, int]]] =None
+                         ) -> None:
+        """
+        Fill one of the two starter corner zones on board,
+        recording moves on trail.
+        Called by fill_two_starter_zones().
+        """
+        # Make a shuffled list of values
+        values = self.random.sample(range(1, self.size + 1), self.size)
+        # Enter tiles into zone:
+        for r in range(start, end):
+            for c in range(start, end):
+                self.place_tile(board, constraints, r, c, values.pop(), trail)
+
+    def solve_board(self,
+                    board: Board,
+                    row: int =0,
+                    col: int =0,
+                    method: Text ='backtrack',
+                    constraints: Optional[Constraints] =None,
+                    max_nodes: Optional[int] =None,
+                    deadline: Optional[float] =None
+                   ) -> Optional[bool]:
+        """
+        Solve /fill a board in place.
+        Cells are filled in row-major order ('backtrack'),
+        or by calling solve_board_mrv() ('mrv'), or by
+        handing off to solve_board_backend() ('propagate',
+        'dlx', or any other backend in solver.BACKENDS).
+        Solves board with its masks constraints (built if not
+        given).  Nothing is shared between calls on different
+        boards.
+        Give up after max_nodes nodes (for the backends, guesses:
+        values tried in a cell with more than one candidate, or
+        rows chosen from a column with more than one row left)
+        or at deadline (a time.perf_counter() time), if given,
+        leaving the board and masks as they were and returning
+        None.
+        """
+        if constraints is None:
+            constraints = Constraints.from_board(self.size, board,
+                                                 self.tile_values)
+        if method in self.backends:
+            return self.solve_board_backend(method, board, constraints,
+                                            max_nodes, deadline)
+        if method == 'mrv':
+            return self.solve_board_mrv(board, None, constraints,
+                                        max_nodes, deadline)
+        # Fill in row-major order from (row, col), iteratively
+        # so there is no recursion limit on the board size
+        search = Search(self.size, board, constraints,
+                        start=row * self.size + col,
+                        tiles=self.tiles, probe=self.probe)
+        solved = search.run(max_nodes, deadline)
+        if solved is None:
+            search.unwind()
+        self.solve_stats = {'nodes': search.nodes,
+                            'backtracks': search.backtracks}
+        return solved
+
+    def solve_board_mrv(self,
+                        board: Board,
+                        empties: Optional[List[int]] =None,
+                        constraints: Optional[Constraints] =None,
+                        max_nodes: Optional[int] =None,
+                        deadline: Optional[float] =None
+                       ) -> Optional[bool]:
+        """
+        Solve /fill a board in place, always branching on the
+        empty cell with the fewest candidates (ties go to the
+        cell with the most empty peers), so dead ends are found
+        near the top of the search.
+        The values placed and dead ends backed up from are saved
+        in self.solve_stats.  max_nodes and deadline are as for
+        solve_board().
+        """
+        if constraints is None:
+            constraints = Constraints.from_board(self.size, board,
+                                                 self.tile_values)
+        search = Search(self.size, board, constraints, mrv=True,
+                        tiles=self.tiles, empties=empties,
+                        probe=self.probe)
+        solved = search.run(max_nodes, deadline)
+        if solved is None:
+            search.unwind()
+        self.solve_stats = {'nodes': search.nodes,
+                            'backtracks': search.backtracks}
+        return solved
+
+    def solve_board_backend(self,
+                            method: Text,
+                            board: Board,
+                            constraints: Optional[Constraints] =None,
+                            max_nodes: Optional[int] =None,
+                            deadline: Optional[float] =None
+                           ) -> Optional[bool]:
+        """
+        Solve /fill a board in place with one of the solver
+        backends: 'propagate' (constraint propagation before
+        the search starts and after every guess) or 'dlx'
+        (Dancing Links exact cover).  The masks
+        (if given) are updated with the cells filled in.
+        What the backend did is saved in self.solve_stats.
+        max_nodes (guesses) and deadline are as for solve_board().
+        """
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        empties = [
+                   i
+                   for i in range(self.size * self.size)
+                   if board[row_of[i]][col_of[i]] is None
+                  ]
+        stats = new_stats()
+        self.solve_stats = stats
+        try:
+            solved = self.backends[method].solve(board, stats,
+                                                 self.tile_values,
+                                                 max_nodes, deadline,
+                                                 self.probe)
+        except TimeoutError:
+            return None
+        # Keep the masks in step with the filled board
+        if solved and constraints is not None:
+            for i in empties:
+                r, c = row_of[i], col_of[i]
+                constraints.place(r, c, self.tile_values[board[r][c]])
+        return solved
+
+    def make_start_board(self,
+                         how_many_start_tiles: int,
+                         unique: bool =False,
+                         deadline: Optional[float] =None
+                        ) -> Board:
+        """
+        Remove tiles from copied solution board
+        to make a starting puzzle board.
+        Set playing_board_empties, and return board.
+        Every tile left comes from the solution board, so the
+        puzzle can always be solved (the solution board is one
+        answer) and no solving is needed to check it, which
+        keeps this quick even for 25 x 25 and 36 x 36 boards.
+        If unique is True, call make_unique_start_board()
+        instead (with deadline), so the puzzle has only one solution.
+        Required:  Solution board must already be created.
+        """
+        if unique:
+            return self.make_unique_start_board(how_many_start_tiles,
+                                                deadline)
+        # Start with solution board copy
+        board = [row[:] for row in self.solution_board]
+        n = self.size * self.size
+        # Make list of indexes, random shuffle
+        indexes_remaining = [i for i in range(n)]
+        self.random.shuffle(indexes_remaining)
+        # Remove tiles until target num remaining
+        self.playing_board_empties = set()
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        while len(indexes_remaining) > how_many_start_tiles:
+            i = indexes_remaining.pop()
+            board[row_of[i]][col_of[i]] = None
+            self.playing_board_empties.add(i)
+        return board
+
+    def make_unique_start_board(self,
+                                how_many_start_tiles: int,
+                                deadline: Optional[float] =None
+                               ) -> Board:
+        """
+        Make a puzzle with one solution and how_many_start_tiles
+        tiles from the solution board, in passes.  The first pass
+        removes tiles from a copy of the solution board in random
+        order, keeping a removal only if the board still has
+        exactly one solution, and usually gets stuck above the
+        target with no tile it can take out.  So each later pass
+        starts from the board with the fewest tiles so far, puts
+        two of its removed tiles back, and removes again in a new
+        order.  Set playing_board_empties, and return board.
+        Raise RuntimeError if unique_passes passes never reach
+        the target, or TimeoutError once deadline (a
+        time.perf_counter() time, if given) has passed, either
+        way giving the fewest tiles reached.
+        Required:  Solution board must already be created.
+        """
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        n = self.size * self.size
+        best = [row[:] for row in self.solution_board]
+        best_count = n
+        for _ in range(self.unique_passes):
+            board = [row[:] for row in best]
+            empties = [
+                       i
+                       for i in range(n)
+                       if board[row_of[i]][col_of[i]] is None
+                      ]
+            for i in self.random.sample(empties, min(2, len(empties))):
+                board[row_of[i]][col_of[i]] = (
+                    self.solution_board[row_of[i]][col_of[i]]
+                )
+            count = self.remove_unique_tiles(board, how_many_start_tiles,
+                                             deadline)
+            # Ties too, so passes can wander off a dead end
+            if count <= best_count:
+                best, best_count = board, count
+            if best_count <= how_many_start_tiles:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                raise TimeoutError('no unique puzzle with ' +
+                                   str(how_many_start_tiles) +
+                                   ' starting tiles made in time '
+                                   '(fewest made: ' + str(best_count) + ')')
+        else:
+            raise RuntimeError('no unique puzzle with ' +
+                               str(how_many_start_tiles) +
+                               ' starting tiles in ' +
+                               str(self.unique_passes) +
+                               ' passes (fewest made: ' +
+                               str(best_count) + ')')
+        self.playing_board_empties = set(
+                                         i
+                                         for i in range(n)
+                                         if best[row_of[i]][col_of[i]] is None
+                                        )
+        return best
+
+    def remove_unique_tiles(self,
+                            board: Board,
+                            how_many_start_tiles: int,
+                            deadline: Optional[float] =None
+                           ) -> int:
+        """
+        One pass of make_unique_start_board(): try removing each
+        tile of board (which has one solution) in random order,
+        putting it back unless the board still has one solution.
+        Stop once how_many_start_tiles are left, or once
+        deadline (if given) has passed, and return how many are
+        left.  Either way the board still has one solution.
+        """
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        filled = [
+                  i
+                  for i in range(self.size * self.size)
+                  if board[row_of[i]][col_of[i]] is not None
+                 ]
+        self.random.shuffle(filled)
+        remaining_tile_count = len(filled)
+        for i in filled:
+            if remaining_tile_count <= how_many_start_tiles:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            row, col = row_of[i], col_of[i]
+            tile = board[row][col]
+            board[row][col] = None
+            # Only one solution (checked with a 2 solution cutoff)
+            try:
+                count = self.backends['dlx'].count(board, 2, self.tile_values,
+                                                   None,
+                                                   self.unique_check_guesses,
+                                                   deadline, self.probe)
+            except TimeoutError:
+                # Too slow to tell (or out of time): taken as more
+                # than one
+                count = 2
+            if count == 1:
+                remaining_tile_count -= 1
+            # Otherwise put the tile back
+            else:
+                board[row][col] = tile
+                if self.probe is not None:
+                    self.probe.retry('make_unique_start_board')
+        return remaining_tile_count
+
+    def is_game_solved(self) -> bool:
+        """
+        Check if playing board is solved: full, with no tile
+        repeated in a row, column or zone (so every row, column
+        and zone holds every tile).  The play state keeps count
+        as moves are made, so there is nothing to rescan.
+        """
+        # If there are multiple solutions, comparing to solution
+        # board won't work, so need to check for solution
+        return self.play_state.is_solved()
+
+    def make_move(self,
+                  row: int,
+                  col: int,
+                  tile: Text
+                 ) -> None:
+        """
+        Make the given move by updating the playing board
+        and play state, and removing the index from the
+        empties list.  A tile already in the cell is replaced.
+        """
+        # Enter the selection onto board
+        self.playing_board[row][col] = tile
+        # Remove index from empties set
+        index = self.layout.index[row][col]
+        self.playing_board_empties.discard(index)
+        self.play_state.place(index, self.tile_values[tile])
+        # The cached solution only still holds if it has this tile
+        self.last_hint = None
+        if (self.hint_solution is not None and
+            self.hint_solution[row][col] != tile):
+            self.hint_solution = None
+
+    def hint(self) -> Optional[Hint]:
+        """
+        A hint for the playing board, as (row, col, tile,
+        technique), or None if it is solved:
+            - if a tile entered is in no solution, the first
+              one not in the solution board, with the right
+              tile, as technique 'mistake'
+            - otherwise the next move forced by logic, and the
+              hardest technique needed to see it (see hints.py)
+            - otherwise the empty cell with the fewest candidates,
+              from a solution keeping every tile entered, as
+              technique 'solution'
+        The solution and the hint are cached until a move
+        changes them, so asking again costs next to nothing.
+        """
+        if self.last_hint is not None:
+            return self.last_hint
+        if self.play_state.is_solved():
+            return None
+        # A solution keeping every tile on the playing board
+        if self.hint_solution is None:
+            board = [row[:] for row in self.playing_board]
+            if self.backends['dlx'].solve(board, None, self.tile_values):
+                self.hint_solution = board
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        if self.hint_solution is None:
+            # Some entered tile is wrong (the starting tiles all
+            # come from the solution board, so one that is not)
+            for i in range(self.size * self.size):
+                row, col = row_of[i], col_of[i]
+                tile = self.playing_board[row][col]
+                if (self.starting_board[row][col] is None and
+                    tile is not None and
+                    tile != self.solution_board[row][col]):
+                    self.last_hint = (row, col, self.solution_board[row][col],
+                                      'mistake')
+                    return self.last_hint
+        step = self.hinter.next_step(self.playing_board, self.tile_values)
+        if step is not None:
+            i, value, technique = step
+            self.last_hint = (row_of[i], col_of[i], self.tiles[value - 1],
+                              technique)
+        else:
+            i = min(self.playing_board_empties,
+                    key=lambda i: self.play_state.candidates(i).bit_count())
+            row, col = row_of[i], col_of[i]
+            self.last_hint = (row, col, self.hint_solution[row][col],
+                              'solution')
+        return self.last_hint
+
+    def candidates(self,
+                   row: int,
+                   col: int
+                  ) -> List[Text]:
+        """
+        Tiles that could go in an empty cell of the playing
+        board, as none of its row, column or zone has them
+        (none for a filled cell).  Kept up to date by every
+        move, so this is only a lookup.
+        """
+        mask = self.play_state.candidates(self.layout.index[row][col])
+        return [self.tiles[v - 1] for v in iter_values(mask)]
+
+    def erase_move(self,
+                   row: int,
+                   col: int
+                  ) -> None:
+        """
+        Empty a cell of the playing board, updating the play
+        state and adding the index back to the empties list.
+        """
+        index = self.layout.index[row][col]
+        self.playing_board_empties.add(index)
+        self.playing_board[row][col] = None
+        self.play_state.remove(index)
+        # (Any cached solution still keeps every tile left)
+        self.last_hint = None
+
+
+def to_values(board: Board,
+              values: Dict[Text, int]
+             ) -> List[List[Optional[int]]]:
+    """
+    A board of tiles as a board of values (values maps
+    tiles to values), with None for an empty cell.
+    """
+    return [[values[tile] if tile else None for tile in row]
+            for row in board]
+
+
+def generate(size: int =9,
+             clues: Optional[int] =None,
+             seed: Optional[Union[int, Text]] =None,
+             unique: bool =False,
+             difficulty: Optional[Text] =None
+            ) -> Tuple[List[List[Optional[int]]], List[List[int]]]:
+    """
+    Make a puzzle of size with clues starting tiles (the
+    known minimum for the size if not given), returning
+    (puzzle, solution).  The same seed (if given) always gives
+    the same puzzle, without touching the random module's
+    numbers.  unique and difficulty are as for set_up_game().
+    """
+    game = Game(random.Random(seed))
+    if clues is None:
+        clues = game.default_start_counts[size]
+    game.set_up_game(size, clues, unique=unique, difficulty=difficulty)
+    game.make_boards()
+    return (to_values(game.starting_board, game.tile_values),
+            to_values(game.solution_board, game.tile_values))
+
+
+def solve(board: List[List[Optional[int]]],
+          method: Text ='dlx'
+         ) -> Optional[List[List[int]]]:
+    """
+    A solved copy of board (ints 1..size, None or 0 for an
+    empty cell), or None if it has no solution.  board is
+    left as it was.  method is a solver backend (see BACKENDS).
+    """
+    size = len(board)
+    key = (method, size)
+    if key not in _solvers:
+        _solvers[key] = BACKENDS[method](size)
+    solved = [[tile or None for tile in row] for row in board]
+    if _solvers[key].solve(solved):
+        return solved
+    return None
+
+
+def generate_puzzles(size: int,
+                     clues: int,
+                     count: int,
+                     unique: bool =False,
+                     count_limit: Optional[int] =2,
+                     seed: Optional[Text] =None,
+                     fill_strategy: Text ='mrv',
+                     difficulty: Optional[Text] =None,
+                     probe: Optional[Probe] =None,
+                     timeout: Optional[float] =None,
+                     max_nodes: Optional[int] =None,
+                     restart_strategy: Optional[Text] ='luby'
+                    ) -> List[Text]:
+    """
+    Generate count puzzles without any input or output, as
+    lines in the clues:count:solution format of tests/tests.
+    The count is the number of solutions (1 for unique puzzles),
+    stopping at count_limit if given: a count that reached it
+    is written with a '+' (such as '2+', at least 2 solutions),
+    as solver.py reads it.  seed (if given) seeds
+    the random numbers, so the same seed gives the same puzzles.
+    fill_strategy is how solutions are filled (see fill_board()),
+    and difficulty (if given) the band every puzzle must grade in.
+    probe (if given) counts what the searches do.  timeout and
+    max_nodes (if given) bound each puzzle, as for make_boards(),
+    which raises TimeoutError, and restart_strategy is when to
+    start a solution board over (see fill_board()).
+    """
+    game = Game(random.Random(seed))
+    game.fill_strategy = fill_strategy
+    game.restart_strategy = restart_strategy
+    game.probe = probe
+    game.set_up_game(size, clues, unique=unique, difficulty=difficulty)
+    lines = []
+    for _ in range(count):
+        game.make_boards(timeout, max_nodes)
+        puzzle = Grid.from_rows(game.starting_board, game.tile_values)
+        solution = Grid.from_rows(game.solution_board, game.tile_values)
+        if unique:
+            num_solu = '1'
+        else:
+            found = game.backends['dlx'].count(game.starting_board,
+                                               count_limit, game.tile_values)
+            num_solu = str(found)
+            # Stopped counting: only a lower bound
+            if count_limit is not None and found >= count_limit:
+                num_solu += '+'
+        lines.append(puzzle.to_string() + ':' + num_solu + ':' +
+                     solution.to_string())
+    return lines
+
+
+def generate_chunk(task: Tuple[int, int, int, int, bool, Optional[int],
+                               Optional[Text], Text, Optional[Text],
+                               Optional[float], Optional[int], Optional[Text]]
+                  ) -> List[Text]:
+    """
+    Generate one chunk of puzzles in a worker process.
+    Each chunk gets its own seed, made from the batch seed
+    and the chunk number, so output does not depend on
+    which worker ran which chunk.
+    """
+    (chunk, size, clues, count, unique, count_limit, seed, fill_strategy,
+     difficulty, timeout, max_nodes, restart_strategy) = task
+    if seed is not None:
+        seed = seed + ':' + str(chunk)
+    return generate_puzzles(size, clues, count, unique, count_limit, seed,
+                            fill_strategy, difficulty, None, timeout,
+                            max_nodes, restart_strategy)
+
+
+def generate_batch(size: int,
+                   clues: int,
+                   count: int,
+                   workers: int =1,
+                   unique: bool =False,
+                   count_limit: Optional[int] =2,
+                   seed: Optional[Text] =None,
+                   chunk_size: int =50,
+                   out=sys.stdout,
+                   fill_strategy: Text ='mrv',
+                   difficulty: Optional[Text] =None,
+                   timeout: Optional[float] =None,
+                   max_nodes: Optional[int] =None,
+                   restart_strategy: Optional[Text] ='luby'
+                  ) -> float:
+    """
+    Generate count puzzles across a pool of worker processes,
+    writing each line to out as soon as its chunk (and every
+    chunk before it) is done.  Return puzzles per second.
+    """
+    tasks = []
+    chunk = 0
+    left = count
+    while left > 0:
+        n = min(chunk_size, left)
+        tasks.append((chunk, size, clues, n, unique, count_limit, seed,
+                      fill_strategy, difficulty, timeout, max_nodes,
+                      restart_strategy))
+        chunk += 1
+        left -= n
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = map(generate_chunk, tasks)
+        for lines in results:
+            out.write('\n'.join(lines) + '\n')
+            out.flush()
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for lines in pool.imap(generate_chunk, tasks):
+                out.write('\n'.join(lines) + '\n')
+                out.flush()
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed else float('inf')
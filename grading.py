@@ -0,0 +1,114 @@
+"""
+Jordan Pemberton
+Sudoku -- difficulty grading
+"""
+
+# Grades a puzzle by solving it the way a person would: using only the
+# easiest technique that still makes progress, in the order of the
+# ladder in propagation.py (singles, pairs, pointing / box-line,
+# X-wing, swordfish, coloring), and going back to the bottom of the
+# ladder after every step.  If the ladder runs out before the puzzle
+# is solved, the rest needs guessing: the puzzle is extreme whatever
+# else it needed, so the guessing goes on from where the ladder
+# stopped, with only the cheaper rules of the solvers (the harder
+# ones cost more per guess than they save), and only its guesses
+# are scored.
+#
+# A grade is the hardest technique the puzzle needed, the difficulty
+# band that puts it in, and a score: each use of a technique (a cell
+# filled, or a cell with candidates cut) adds that technique's weight,
+# so a puzzle needing many hard steps scores higher than one needing
+# a single hard step.
+
+
+from typing import Any, Dict, List, Optional, Text, Tuple
+from propagation import LADDER, Propagator, new_stats
+
+# Score for each use of a technique, and for each guess
+WEIGHTS = {
+           'naked_singles':  1,
+           'hidden_singles': 2,
+           'naked_pairs':    5,
+           'hidden_pairs':   8,
+           'pointing':       6,
+           'box_line':       6,
+           'x_wing':         15,
+           'swordfish':      25,
+           'coloring':       35,
+           'guesses':        100
+          }
+
+# Difficulty bands, easiest first, and the hardest
+# technique a puzzle in each band needs
+BANDS = {
+         'easy':    ('naked_singles', 'hidden_singles'),
+         'medium':  ('naked_pairs', 'hidden_pairs', 'pointing', 'box_line'),
+         'hard':    ('x_wing', 'swordfish'),
+         'expert':  ('coloring',),
+         'extreme': ('guesses',)
+        }
+
+Grade = Tuple[Text, Text, int]
+
+
+def band_of(technique: Optional[Text]) -> Text:
+    """
+    The difficulty band of a puzzle whose hardest technique
+    is technique (None if it needed none at all: 'easy').
+    """
+    for band, techniques in BANDS.items():
+        if technique in techniques:
+            return band
+    return 'easy'
+
+
+class Grader:
+    """
+    Grades puzzles of one size.
+    """
+    def __init__(self,
+                 size: int
+                ) -> None:
+        """
+        Make the propagator, with every rule on the ladder,
+        and the one that guesses once the ladder runs out.
+        """
+        self.size = size
+        self.propagator = Propagator(size, LADDER)
+        self.searcher = Propagator(size)
+
+    def grade(self,
+              board: List[List[Any]],
+              values: Optional[Dict[Any, int]] =None,
+              stats: Optional[Dict[Text, int]] =None,
+              deadline: Optional[float] =None
+             ) -> Optional[Grade]:
+        """
+        Grade a board (None or 0 for an empty cell), returning
+        (hardest technique, band, score), or None if the board
+        has no solution.  If given, values maps tiles to values,
+        and stats is filled in with the uses of each technique.
+        Raise TimeoutError if guessing runs past deadline (a
+        time.perf_counter() time).
+        """
+        if stats is None:
+            stats = new_stats(LADDER)
+        propagator = self.propagator
+        cands = propagator.candidates(board, values)
+        if not propagator.propagate(cands, None, stats):
+            return None
+        # Ladder ran out: guess the rest, from the ladder's
+        # candidates (nothing left to queue)
+        if any(mask & (mask - 1) for mask in cands):
+            guessed = new_stats()
+            if self.searcher.search(cands, guessed, [],
+                                    deadline=deadline) is None:
+                return None
+            stats['guesses'] += guessed['guesses']
+        hardest = None
+        for technique in LADDER + ('guesses',):
+            if stats[technique]:
+                hardest = technique
+        score = sum(WEIGHTS[technique] * count
+                    for technique, count in stats.items())
+        return hardest, band_of(hardest), score
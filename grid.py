@@ -0,0 +1,163 @@
+"""
+Jordan Pemberton
+Sudoku -- compact board
+"""
+
+# A board stored as one flat bytearray of values, row by row:
+# cell (row, col) is cells[row * size + col], holding 1..size, or 0
+# for an empty cell.  An 81 cell board takes about a tenth of the
+# memory of the nested-list form, which matters where boards are kept
+# by the thousand (canonical.py's duplicate finding keeps one for every
+# puzzle it has seen).  It is only a storage and line format: a Game
+# makes and plays its boards as nested lists, and converts them to
+# Grids only to write them out, so it gets no saving from it.
+#
+# A Grid can change, so it cannot be hashed: key() gives the board
+# as bytes, for keeping boards in sets and dicts.
+#
+# Grids convert losslessly to and from the nested-list boards used
+# by sudoku.py (tiles, or None) and solver.py (ints, or None), and
+# the compact strings of the clues:count:solution line format.
+
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Text, Union
+import math
+
+# One character per value in compact strings, '.' for an empty
+# cell (9 x 9 boards use 1-9 as usual, and 36 x 36 boards end with 0)
+SYMBOLS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ0'
+EMPTY = '.'
+# str.translate() table from symbols to the characters
+# with their values as codes, for from_string()
+_VALUES = {ord(symbol): v + 1 for v, symbol in enumerate(SYMBOLS)}
+_VALUES[ord(EMPTY)] = 0
+
+
+class Grid:
+    """
+    Flat, compact Sudoku board of values (0 for empty).
+    """
+    __slots__ = ('size', 'cells')
+
+    def __init__(self,
+                 size: int,
+                 cells: Optional[Union[bytes, bytearray, Sequence[int]]] =None
+                ) -> None:
+        """
+        Make a board of the given size, empty unless
+        cells (size * size values, row by row) is given.
+        """
+        self.size = size
+        if cells is None:
+            self.cells = bytearray(size * size)
+        else:
+            self.cells = bytearray(cells)
+            if len(self.cells) != size * size:
+                raise ValueError('expected ' + str(size * size) +
+                                 ' cells, got ' + str(len(self.cells)))
+
+    @classmethod
+    def from_rows(cls,
+                  rows: List[List[Any]],
+                  values: Optional[Dict[Any, int]] =None
+                 ) -> 'Grid':
+        """
+        Make a Grid from a nested-list board (None or 0 for an
+        empty cell).  If given, values maps each tile on the
+        board to its value 1..size, otherwise tiles are ints.
+        """
+        size = len(rows)
+        cells = bytearray(size * size)
+        i = 0
+        for row in rows:
+            for tile in row:
+                if tile:
+                    cells[i] = values[tile] if values is not None else tile
+                i += 1
+        return cls(size, cells)
+
+    @classmethod
+    def from_string(cls,
+                    text: Text
+                   ) -> 'Grid':
+        """
+        Make a Grid from a compact string ('.' for empty).
+        """
+        text = text.strip()
+        size = math.isqrt(len(text))
+        if size * size != len(text):
+            raise ValueError('not a square board: ' + repr(text))
+        # One pass in C, rather than a lookup per symbol
+        values = text.translate(_VALUES)
+        if values.strip(''.join(map(chr, range(size + 1)))):
+            raise ValueError('not a board of size ' + str(size) + ': ' +
+                             repr(text))
+        return cls(size, values.encode('latin-1'))
+
+    def to_rows(self,
+                tiles: Optional[Sequence[Any]] =None
+               ) -> List[List[Any]]:
+        """
+        Nested-list form of the board, with None for an empty
+        cell.  If given, tiles[v - 1] stands in for value v,
+        otherwise values are ints.
+        """
+        size = self.size
+        cells = self.cells
+        return [
+                [
+                 (tiles[v - 1] if tiles is not None else v) if v else None
+                 for v in cells[r * size:(r + 1) * size]
+                ]
+                for r in range(size)
+               ]
+
+    def to_string(self) -> Text:
+        """
+        Compact string form of the board ('.' for empty).
+        """
+        return ''.join(SYMBOLS[v - 1] if v else EMPTY for v in self.cells)
+
+    def key(self) -> bytes:
+        """
+        The values as bytes, the same for equal boards, to use
+        as a set member or dict key.  Later changes to the board
+        do not change a key already made.
+        """
+        return bytes(self.cells)
+
+    def __getitem__(self,
+                    i: int
+                   ) -> int:
+        """
+        Value at flat index i (row * size + col).
+        """
+        return self.cells[i]
+
+    def __setitem__(self,
+                    i: int,
+                    value: int
+                   ) -> None:
+        """
+        Put value at flat index i (row * size + col).
+        """
+        self.cells[i] = value
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.cells)
+
+    def __eq__(self,
+               other: object
+              ) -> bool:
+        if not isinstance(other, Grid):
+            return NotImplemented
+        return self.size == other.size and self.cells == other.cells
+
+    # Mutable, so not hashable (use key())
+    __hash__ = None
+
+    def __repr__(self) -> Text:
+        return 'Grid.from_string(' + repr(self.to_string()) + ')'
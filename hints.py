@@ -0,0 +1,117 @@
+"""
+Jordan Pemberton
+Sudoku -- hints
+"""
+
+# Finds the next move a person could make on a board by logic alone,
+# and the technique that forces it.  Like the grader (grading.py), it
+# climbs the ladder in propagation.py: a naked or hidden single is a
+# move straight away; otherwise the easiest rule that cuts any
+# candidates is used, and then it looks for singles again.  The
+# technique given for a move is the hardest one used on the way to it.
+#
+# Only the candidates are worked on, never the board, and the rules
+# stop at the first move found, so a hint leaves the board as it was
+# and costs less than propagating the whole board would.  When
+# no rule on the ladder forces a move, there is no logical hint, and
+# Game.hint() (engine.py) falls back on a solution of the board instead.
+
+
+from typing import Any, Dict, List, Optional, Text, Tuple
+from propagation import LADDER, Candidates, Propagator, new_stats
+from constraints import iter_values
+
+# (cell, value, technique): the cell as a flat index, value 1..size,
+# and the name of a rule on the ladder
+Step = Tuple[int, int, Text]
+
+
+class Hinter:
+    """
+    Finds logical next moves on boards of one size.
+    """
+    def __init__(self,
+                 size: int
+                ) -> None:
+        """
+        Make the propagator, with every rule on the ladder.
+        """
+        self.size = size
+        self.propagator = Propagator(size, LADDER)
+
+    def next_step(self,
+                  board: List[List[Any]],
+                  values: Optional[Dict[Any, int]] =None
+                 ) -> Optional[Step]:
+        """
+        The next logically forced move on a board (None or 0
+        for an empty cell), as (cell, value, technique), or None
+        if the ladder forces nothing (or finds the board has no
+        solution).  If given, values maps tiles to values.
+        """
+        propagator = self.propagator
+        cands = propagator.candidates(board, values)
+        empties = [
+                   i
+                   for i in range(self.size * self.size)
+                   if not board[propagator.row_of[i]][propagator.col_of[i]]
+                  ]
+        stats = new_stats(LADDER)
+        queue = []
+        # Every rule but the singles, easiest first
+        rules = [
+                 (rank, rule, getattr(propagator, rule))
+                 for rank, rule in enumerate(LADDER)
+                 if rank >= 2
+                ]
+        hardest = None
+        hardest_rank = -1
+        while True:
+            # No candidates left for a cell: no solution
+            if not all(cands[i] for i in empties):
+                return None
+            single = self.single(cands, empties)
+            if single is not None:
+                cell, value, technique = single
+                if hardest is not None:
+                    technique = hardest
+                return cell, value, technique
+            for rank, rule, apply in rules:
+                changed = apply(cands, queue, stats)
+                if changed is None:
+                    return None
+                if changed:
+                    if rank > hardest_rank:
+                        hardest, hardest_rank = rule, rank
+                    break
+            else:
+                return None
+
+    def single(self,
+               cands: Candidates,
+               empties: List[int]
+              ) -> Optional[Step]:
+        """
+        A naked single (an empty cell with one candidate), or
+        failing that a hidden single (a value with one place
+        left in a unit, that place empty), as (cell, value,
+        technique), or None if there are none.
+        """
+        for i in empties:
+            mask = cands[i]
+            if not mask & (mask - 1):
+                return i, mask.bit_length() - 1, 'naked_singles'
+        open_cells = set(empties)
+        for unit in self.propagator.units:
+            once = twice = 0
+            for i in unit:
+                twice |= once & cands[i]
+                once |= cands[i]
+            for value in iter_values(once & ~twice):
+                bit = 1 << value
+                for i in unit:
+                    if cands[i] & bit:
+                        if i in open_cells:
+                            return i, value, 'hidden_singles'
+                        break
+        return None
@@ -0,0 +1,101 @@
+"""
+Jordan Pemberton
+Sudoku -- board layout tables
+"""
+
+# Every cell has a flat index, i = row * size + col, and the solvers
+# address cells by it.  Everything else about where a cell sits comes
+# from tables made once per board size and shared by everything that
+# works on boards of that size (see layout()), rather than from
+# working out row // zone_size and the like again in every loop:
+#       row_of, col_of, zone_of     row, column and zone of each cell
+#       index                       flat index of (row, col), as
+#                                   index[row][col]
+#       zone_at                     zone of (row, col), as zone_at[row][col]
+#       rows, cols, zones           cells of each row, column and zone
+#       units                       rows, then columns, then zones
+#       units_of                    the three units of each cell, as
+#                                   indexes into units
+#       peers, peer_sets            cells sharing a unit with each cell
+#       bands, band_of              rows of each band (also the columns
+#                                   of each stack), band of each row
+# Zones are numbered row by row: zone (row - row % z) + col // z,
+# where z is the zone size.  The tables are tuples, so nothing can
+# change them for the other users.
+
+
+import math
+
+# Layouts made so far, by size
+_layouts = {}
+
+
+class Layout:
+    """
+    Index tables for boards of one size.
+    """
+    __slots__ = ('size', 'zone_size', 'row_of', 'col_of', 'zone_of', 'index',
+                 'zone_at', 'rows', 'cols', 'zones', 'units', 'units_of',
+                 'peers', 'peer_sets', 'bands', 'band_of')
+
+    def __init__(self,
+                 size: int
+                ) -> None:
+        """
+        Build every table for boards of the given size.
+        (Use layout() to share them.)
+        """
+        z = math.isqrt(size)
+        n = size * size
+        self.size = size
+        self.zone_size = z
+        self.row_of = tuple(i // size for i in range(n))
+        self.col_of = tuple(i % size for i in range(n))
+        self.zone_of = tuple(
+                             (i // size - i // size % z) + i % size // z
+                             for i in range(n)
+                            )
+        self.index = tuple(
+                           tuple(r * size + c for c in range(size))
+                           for r in range(size)
+                          )
+        self.zone_at = tuple(
+                             tuple(self.zone_of[r * size + c]
+                                   for c in range(size))
+                             for r in range(size)
+                            )
+        self.rows = self.index
+        self.cols = tuple(
+                          tuple(r * size + c for r in range(size))
+                          for c in range(size)
+                         )
+        self.zones = tuple(
+                           tuple(i for i in range(n) if self.zone_of[i] == zone)
+                           for zone in range(size)
+                          )
+        self.units = self.rows + self.cols + self.zones
+        self.units_of = tuple(
+                              (self.row_of[i],
+                               size + self.col_of[i],
+                               2 * size + self.zone_of[i])
+                              for i in range(n)
+                             )
+        self.peer_sets = tuple(
+                               frozenset(self.rows[self.row_of[i]] +
+                                         self.cols[self.col_of[i]] +
+                                         self.zones[self.zone_of[i]]) - {i}
+                               for i in range(n)
+                              )
+        self.peers = tuple(tuple(sorted(peers)) for peers in self.peer_sets)
+        self.bands = tuple(tuple(range(b, b + z)) for b in range(0, size, z))
+        self.band_of = tuple(r // z for r in range(size))
+
+
+def layout(size: int) -> Layout:
+    """
+    The layout tables for boards of size, made on first use.
+    """
+    tables = _layouts.get(size)
+    if tables is None:
+        tables = _layouts[size] = Layout(size)
+    return tables
@@ -0,0 +1,165 @@
+"""
+Jordan Pemberton
+Sudoku -- play state
+"""
+
+# Keeps track of a board as it is played, so nothing has to rescan the
+# board after a move.  For every unit (row, column, zone, numbered as
+# in layout.py) it counts how many times each value is in it, and it
+# keeps a running count of conflicts: each value in a unit more than
+# once adds one conflict per extra copy.  Putting a value in or taking
+# one out only touches the counts of the cell's three units, so:
+#       is_solved()     no empty cells and no conflicts, in O(1) (a
+#                       full board with no repeats in any unit holds
+#                       every value in every unit)
+#       is_conflict()   whether a cell's value is repeated in one of
+#                       its units, in O(1)
+#
+# It also keeps the candidates (pencil marks) of every cell: a mask of
+# the values not yet in any of its units, using the same bits as
+# constraints.py (value v is bit 1 << v).  A value only changes the
+# candidates when it is the first copy put in a unit or the last one
+# taken out, and then only those of the cells in that unit, so a move
+# touches at most the cell's peers however big the board is.
+# Cells are flat indexes (row * size + col), values 1..size.
+
+
+from typing import Any, Dict, List, Optional
+from layout import layout
+
+
+class PlayState:
+    """
+    Per-unit value counts, conflicts and cell candidates for
+    a board being played.
+    """
+    __slots__ = ('size', 'layout', 'values', 'counts', 'filled', 'conflicts',
+                 'used', 'cands')
+
+    def __init__(self,
+                 size: int,
+                 board: Optional[List[List[Any]]] =None,
+                 values: Optional[Dict[Any, int]] =None
+                ) -> None:
+        """
+        Start with an empty board, then place every tile of
+        board (if given; None or 0 for an empty cell).  If
+        given, values maps each tile to its value 1..size,
+        otherwise tiles are taken to be ints.
+        """
+        self.size = size
+        self.layout = layout(size)
+        # Value in each cell (0 for empty)
+        self.values = [0] * (size * size)
+        # Times each value is in each unit
+        self.counts = [[0] * (size + 1) for _ in range(3 * size)]
+        self.filled = 0
+        self.conflicts = 0
+        # Values in each unit, and values in none of the units of
+        # each cell (every value, on an empty board)
+        self.used = [0] * (3 * size)
+        self.cands = [((1 << size) - 1) << 1] * (size * size)
+        if board is not None:
+            for cell, (row, col) in enumerate(zip(self.layout.row_of,
+                                                  self.layout.col_of)):
+                tile = board[row][col]
+                if tile:
+                    self.place(cell, values[tile] if values is not None
+                                     else tile)
+
+    def place(self,
+              cell: int,
+              value: int
+             ) -> None:
+        """
+        Put value in cell (taking out what was there first).
+        """
+        if self.values[cell]:
+            self.remove(cell)
+        self.values[cell] = value
+        self.filled += 1
+        counts = self.counts
+        cands = self.cands
+        bit = 1 << value
+        for unit in self.layout.units_of[cell]:
+            if counts[unit][value]:
+                self.conflicts += 1
+            # First in the unit: no longer a candidate in it
+            else:
+                self.used[unit] |= bit
+                for j in self.layout.units[unit]:
+                    cands[j] &= ~bit
+            counts[unit][value] += 1
+
+    def remove(self,
+               cell: int
+              ) -> int:
+        """
+        Empty cell, returning the value that was in it
+        (0 if it was already empty).
+        """
+        value = self.values[cell]
+        if not value:
+            return 0
+        self.values[cell] = 0
+        self.filled -= 1
+        counts = self.counts
+        used = self.used
+        cands = self.cands
+        units_of = self.layout.units_of
+        bit = 1 << value
+        for unit in units_of[cell]:
+            counts[unit][value] -= 1
+            if counts[unit][value]:
+                self.conflicts -= 1
+            # Last out of the unit: a candidate again in each of its
+            # cells, unless one of that cell's other units has it
+            else:
+                used[unit] &= ~bit
+                for j in self.layout.units[unit]:
+                    r, c, z = units_of[j]
+                    if not (used[r] | used[c] | used[z]) & bit:
+                        cands[j] |= bit
+        return value
+
+    def candidates(self,
+                   cell: int
+                  ) -> int:
+        """
+        Mask of the values that could go in cell, as none of
+        its units has them (0 if the cell is filled).
+        """
+        if self.values[cell]:
+            return 0
+        return self.cands[cell]
+
+    def is_conflict(self,
+                    cell: int
+                   ) -> bool:
+        """
+        Whether the value in cell is also in one of its
+        row, column or zone.
+        """
+        value = self.values[cell]
+        if not value:
+            return False
+        counts = self.counts
+        return any(counts[unit][value] > 1
+                   for unit in self.layout.units_of[cell])
+
+    def conflicting_cells(self) -> List[int]:
+        """
+        Every cell whose value is also in one of its units
+        (none, without looking at any cell, if there are no
+        conflicts).
+        """
+        if not self.conflicts:
+            return []
+        return [cell for cell in range(self.size * self.size)
+                if self.is_conflict(cell)]
+
+    def is_solved(self) -> bool:
+        """
+        Whether every cell is filled with no conflicts.
+        """
+        return self.filled == self.size * self.size and not self.conflicts
@@ -0,0 +1,98 @@
+"""
+Jordan Pemberton
+Sudoku -- search instrumentation
+"""
+
+# A Probe counts what the searches do, for finding out where a slow
+# solve or generate spends its time.  It is opt-in: Search, ZoneSearch,
+# the backends (Propagator, DancingLinks), solver.solve() and Game all
+# take a probe (None by default), and only check for one with a single
+# `is not None` test at each step, so with no probe the searches run
+# as before.
+#
+# Counts:
+#       calls       cells a search moved on to (one per push, what was
+#                   one recursive call in the recursive solvers); for
+#                   the backends, cells guessed on (propagate) or
+#                   columns branched on (dlx)
+#       placements  values placed; for the backends, guesses tried
+#                   (propagate) or rows chosen (dlx)
+#       backtracks  dead ends backed up from
+#       checks      candidate checks: cells whose candidates were
+#                   worked out (Search and ZoneSearch only)
+#       max_depth   most cells a search had filled at once
+#       retries     by loop name, times a loop started over or threw
+#                   away its work (fill_board restarts, tiles put back
+#                   by make_unique_start_board, puzzles thrown away by
+#                   make_boards for grading in the wrong band)
+# If given, hook(probe, search) is called every `every` placements,
+# for live progress or sampling.
+
+
+from typing import Any, Callable, Dict, Optional, Text
+
+
+class Probe:
+    """
+    Counters for searches, with an optional hook called as
+    values are placed.  One probe can be shared by any number
+    of searches, and keeps counting until reset().
+    """
+    def __init__(self,
+                 hook: Optional[Callable[['Probe', Any], None]] =None,
+                 every: int =1
+                ) -> None:
+        """
+        Start with every count at zero.  If given, hook is
+        called with the probe and the search every `every`
+        placements.
+        """
+        self.hook = hook
+        self.every = max(1, every)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Set every count back to zero.
+        """
+        self.calls = 0
+        self.placements = 0
+        self.backtracks = 0
+        self.checks = 0
+        self.max_depth = 0
+        self.retries = {}
+
+    def node(self,
+             search: Any,
+             depth: int
+            ) -> None:
+        """
+        Count a value placed by search, with depth cells
+        filled, and call the hook if it is due.
+        """
+        self.placements += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.hook is not None and self.placements % self.every == 0:
+            self.hook(self, search)
+
+    def retry(self,
+              loop: Text
+             ) -> None:
+        """
+        Count a retry of the loop named loop.
+        """
+        self.retries[loop] = self.retries.get(loop, 0) + 1
+
+    def as_dict(self) -> Dict[Text, Any]:
+        """
+        Every count, as a dict (ready for JSON).
+        """
+        return {
+                'calls':      self.calls,
+                'placements': self.placements,
+                'backtracks': self.backtracks,
+                'checks':     self.checks,
+                'max_depth':  self.max_depth,
+                'retries':    dict(self.retries)
+               }
@@ -0,0 +1,680 @@
+"""
+Jordan Pemberton
+Sudoku -- constraint propagation
+"""
+
+# Fills in what can be deduced about a board before guessing:
+#       naked singles   a cell with one candidate left
+#       hidden singles  a value with one place left in a unit
+#       naked pairs     two cells in a unit with the same two candidates
+#       hidden pairs    two values with the same two places in a unit
+#       pointing        a value confined to one row / column of a zone
+#       box-line        a value confined to one zone of a row / column
+# and, for grading (see grading.py), three harder ones:
+#       x-wing          a value in two rows confined to the same two
+#                       columns (or the other way round)
+#       swordfish       the same with three rows and three columns
+#       coloring        chains of the only two places for a value in a
+#                       unit, colored alternately: one color is the value
+# The rules are run over and over (cheapest first) until none of them
+# changes anything.  search() runs them before the first guess and
+# again after every guess, so most boards need few or no guesses.
+# A guess that leads to a contradiction is turned into a deduction:
+# the value is taken out of its cell and the rules run again, so the
+# other value of a two-candidate cell is never a guess of its own.
+# It keeps a stack of the candidates before each guess rather than
+# recursing, so it works on boards of any size.
+# It can be given a budget of guesses and a deadline, and raises
+# TimeoutError when it runs past either.
+#
+# A board is a flat list of candidate masks, one per cell, using the
+# same bits as constraints.py (value v is bit 1 << v).  A cell with a
+# single bit left is solved.
+
+
+from typing import Any, Dict, List, Optional, Sequence, Text
+from constraints import Constraints, iter_values
+from layout import layout
+from probe import Probe
+import itertools
+import time
+
+Candidates = List[int]
+
+# Names of the rules, as counted in stats (the solvers use these)
+RULES = (
+         'naked_singles',
+         'hidden_singles',
+         'naked_pairs',
+         'hidden_pairs',
+         'pointing',
+         'box_line'
+        )
+
+# Every rule, easiest first (the grader uses these)
+LADDER = RULES + (
+                  'x_wing',
+                  'swordfish',
+                  'coloring'
+                 )
+
+
+def new_stats(rules: Sequence[Text] =RULES) -> Dict[Text, int]:
+    """
+    Make an empty stats dict: for each rule, how many cells
+    it filled (singles) or cut candidates from (the others),
+    and how many guesses the search made.
+    """
+    stats = {rule: 0 for rule in rules}
+    stats['guesses'] = 0
+    return stats
+
+
+class Propagator:
+    """
+    Propagation rules and search for boards of one size.
+    """
+    def __init__(self,
+                 size: int,
+                 rules: Sequence[Text] =RULES
+                ) -> None:
+        """
+        Take the units (rows, columns, zones) and peers of
+        every cell, as flat indexes (row * size + col), from
+        the shared layout for this size.
+        rules (names from LADDER, naked singles always on)
+        are the ones propagate() runs.
+        """
+        self.size = size
+        self.rules = tuple(rules)
+        tables = layout(size)
+        self.zone_size = tables.zone_size
+        self.rows = tables.rows
+        self.cols = tables.cols
+        self.zones = tables.zones
+        self.units = tables.units
+        # Row, column and zone of each cell
+        self.row_of = tables.row_of
+        self.col_of = tables.col_of
+        self.zone_of = tables.zone_of
+        self.peers = tables.peers
+        self.peer_sets = tables.peer_sets
+        # For pointing and box-line, the parts where a zone and a
+        # line cross.  A zone's cells run row by row, so each z
+        # of them in a row are one of its rows, and every z-th one
+        # of its columns; each run of z cells of a line is in one
+        # zone.  For each zone, (cells, whole row) for its rows
+        # and (cells, whole column) for its columns, and for each
+        # line, (cells, zone) for its runs
+        z = self.zone_size
+        self.zone_parts = tuple(
+                                (tuple((unit[k * z:(k + 1) * z],
+                                        self.rows[self.row_of[unit[k * z]]])
+                                       for k in range(z)),
+                                 tuple((unit[k::z],
+                                        self.cols[self.col_of[unit[k]]])
+                                       for k in range(z)))
+                                for unit in self.zones
+                               )
+        self.line_parts = tuple(
+                                tuple((unit[k:k + z], self.zone_of[unit[k]])
+                                      for k in range(0, size, z))
+                                for unit in self.units[:2 * size]
+                               )
+
+    def candidates(self,
+                   board: List[List[Any]],
+                   values: Optional[Dict[Any, int]] =None
+                  ) -> Candidates:
+        """
+        Candidate masks for a board (None or 0 for an empty
+        cell).  If given, values maps each tile on the board to
+        its value 1..size, otherwise tiles are taken to be ints.
+        """
+        constraints = Constraints.from_board(self.size, board, values)
+        cands = []
+        for row in range(self.size):
+            for col in range(self.size):
+                tile = board[row][col]
+                if tile:
+                    value = values[tile] if values is not None else tile
+                    cands.append(1 << value)
+                else:
+                    cands.append(constraints.candidates_mask(row, col))
+        return cands
+
+    def eliminate(self,
+                  cands: Candidates,
+                  i: int,
+                  mask: int,
+                  queue: List[int]
+                 ) -> bool:
+        """
+        Remove the values in mask from cell i.  If only one value
+        is left, queue the cell so its value is removed from its
+        peers.  Return False if no value is left.
+        """
+        left = cands[i] & ~mask
+        if left == cands[i]:
+            return True
+        cands[i] = left
+        if not left:
+            return False
+        if not left & (left - 1):
+            queue.append(i)
+        return True
+
+    def propagate(self,
+                  cands: Candidates,
+                  queue: Optional[List[int]] =None,
+                  stats: Optional[Dict[Text, int]] =None
+                 ) -> bool:
+        """
+        Run the rules on cands (in place) until nothing changes.
+        queue holds the solved cells whose values have not yet
+        been removed from their peers (all solved cells if None).
+        Return False if the board turns out to have no solution.
+        """
+        if queue is None:
+            queue = [i for i, mask in enumerate(cands)
+                     if not mask & (mask - 1)]
+        if stats is None:
+            stats = new_stats(self.rules)
+        rules = [
+                 getattr(self, rule)
+                 for rule in self.rules
+                 if rule != 'naked_singles'
+                ]
+        while True:
+            # Naked singles: remove each solved value from its peers
+            while queue:
+                i = queue.pop()
+                bit = cands[i]
+                for j in self.peers[i]:
+                    if cands[j] & bit:
+                        waiting = len(queue)
+                        if not self.eliminate(cands, j, bit, queue):
+                            return False
+                        # Peer left with one candidate
+                        if len(queue) > waiting:
+                            stats['naked_singles'] += 1
+            # Then the other rules, cheapest first, going back
+            # to singles as soon as one of them finds something
+            for rule in rules:
+                changed = rule(cands, queue, stats)
+                if changed is None:
+                    return False
+                if changed:
+                    break
+            else:
+                return True
+
+    def hidden_singles(self,
+                       cands: Candidates,
+                       queue: List[int],
+                       stats: Dict[Text, int]
+                      ) -> Optional[bool]:
+        """
+        Place each value that has one place left in a unit.
+        Return True if anything changed, None on a contradiction.
+        """
+        changed = False
+        for unit in self.units:
+            once = 0
+            twice = 0
+            solved = 0
+            for i in unit:
+                mask = cands[i]
+                twice |= once & mask
+                once |= mask
+                if not mask & (mask - 1):
+                    solved |= mask
+            # Some value has nowhere to go
+            if once != (((1 << self.size) - 1) << 1):
+                return None
+            for value in iter_values(once & ~twice & ~solved):
+                bit = 1 << value
+                for i in unit:
+                    if cands[i] & bit:
+                        if cands[i] != bit:
+                            cands[i] = bit
+                            queue.append(i)
+                            stats['hidden_singles'] += 1
+                            changed = True
+                        break
+        return changed
+
+    def naked_pairs(self,
+                    cands: Candidates,
+                    queue: List[int],
+                    stats: Dict[Text, int]
+                   ) -> Optional[bool]:
+        """
+        Two cells in a unit with the same two candidates take
+        those two values, so remove them from the rest of the unit.
+        Return True if anything changed, None on a contradiction.
+        """
+        changed = False
+        for unit in self.units:
+            seen = {}
+            for i in unit:
+                mask = cands[i]
+                if mask.bit_count() != 2:
+                    continue
+                if mask not in seen:
+                    seen[mask] = i
+                    continue
+                pair = (seen[mask], i)
+                for j in unit:
+                    if j not in pair and cands[j] & mask:
+                        if not self.eliminate(cands, j, mask, queue):
+                            return None
+                        stats['naked_pairs'] += 1
+                        changed = True
+        return changed
+
+    def hidden_pairs(self,
+                     cands: Candidates,
+                     queue: List[int],
+                     stats: Dict[Text, int]
+                    ) -> Optional[bool]:
+        """
+        Two values with the same two places in a unit must go in
+        those two cells, so remove every other value from them.
+        Return True if anything changed, None on a contradiction.
+        """
+        changed = False
+        for unit in self.units:
+            # Values with exactly two places in the unit
+            once = twice = thrice = 0
+            for i in unit:
+                mask = cands[i]
+                thrice |= twice & mask
+                twice |= once & mask
+                once |= mask
+            two = twice & ~thrice
+            # Need two such values to make a pair
+            if not two & (two - 1):
+                continue
+            places = {}
+            for value in iter_values(two):
+                bit = 1 << value
+                where = tuple(i for i in unit if cands[i] & bit)
+                if len(where) != 2:
+                    continue
+                if where not in places:
+                    places[where] = bit
+                    continue
+                pair = places[where] | bit
+                for i in where:
+                    if cands[i] & ~pair:
+                        cands[i] &= pair
+                        stats['hidden_pairs'] += 1
+                        changed = True
+        return changed
+
+    def pointing(self,
+                 cands: Candidates,
+                 queue: List[int],
+                 stats: Dict[Text, int]
+                ) -> Optional[bool]:
+        """
+        A value whose places in a zone all share one row (or
+        column) can be removed from the rest of that row (column).
+        Return True if anything changed, None on a contradiction.
+        """
+        changed = False
+        for zone, unit in enumerate(self.zones):
+            once = twice = solved = 0
+            for i in unit:
+                mask = cands[i]
+                twice |= once & mask
+                once |= mask
+                if not mask & (mask - 1):
+                    solved |= mask
+            # For the zone's rows, then its columns: the values
+            # of each, and the values in just one of them
+            segments = []
+            for parts in self.zone_parts[zone]:
+                masks = []
+                in_one = in_two = 0
+                for cells, line in parts:
+                    mask = 0
+                    for i in cells:
+                        mask |= cands[i]
+                    masks.append((mask, line))
+                    in_two |= in_one & mask
+                    in_one |= mask
+                segments.append((in_one & ~in_two, masks))
+            # Unsolved values with two or more places
+            for value in iter_values(twice & ~solved):
+                bit = 1 << value
+                for confined, masks in segments:
+                    if not confined & bit:
+                        continue
+                    line = next(line for mask, line in masks if mask & bit)
+                    for j in line:
+                        if self.zone_of[j] != zone and cands[j] & bit:
+                            if not self.eliminate(cands, j, bit, queue):
+                                return None
+                            stats['pointing'] += 1
+                            changed = True
+        return changed
+
+    def box_line(self,
+                 cands: Candidates,
+                 queue: List[int],
+                 stats: Dict[Text, int]
+                ) -> Optional[bool]:
+        """
+        A value whose places in a row (or column) all share one
+        zone can be removed from the rest of that zone.
+        Return True if anything changed, None on a contradiction.
+        """
+        changed = False
+        line_parts = self.line_parts
+        for first, line_of in ((0, self.row_of),
+                               (self.size, self.col_of)):
+            for line in range(self.size):
+                # The values of each of the line's runs (each in
+                # one zone), and the values in just one of them
+                masks = []
+                once = twice = solved = 0
+                in_one = in_two = 0
+                for cells, zone in line_parts[first + line]:
+                    part = 0
+                    for i in cells:
+                        mask = cands[i]
+                        twice |= once & mask
+                        once |= mask
+                        if not mask & (mask - 1):
+                            solved |= mask
+                        part |= mask
+                    masks.append((part, zone))
+                    in_two |= in_one & part
+                    in_one |= part
+                # Unsolved values with two or more places,
+                # all in one zone
+                for value in iter_values(twice & ~solved &
+                                         in_one & ~in_two):
+                    bit = 1 << value
+                    zone = next(zone for part, zone in masks if part & bit)
+                    for j in self.zones[zone]:
+                        if line_of[j] != line and cands[j] & bit:
+                            if not self.eliminate(cands, j, bit, queue):
+                                return None
+                            stats['box_line'] += 1
+                            changed = True
+        return changed
+
+    def x_wing(self,
+               cands: Candidates,
+               queue: List[int],
+               stats: Dict[Text, int]
+              ) -> Optional[bool]:
+        """
+        A value whose places in two rows are in the same two
+        columns can be removed from the rest of those columns
+        (and the same with rows and columns swapped).
+        Return True if anything changed, None on a contradiction.
+        """
+        return self.fish(cands, queue, stats, 2, 'x_wing')
+
+    def swordfish(self,
+                  cands: Candidates,
+                  queue: List[int],
+                  stats: Dict[Text, int]
+                 ) -> Optional[bool]:
+        """
+        As x_wing(), but with three rows and three columns.
+        Return True if anything changed, None on a contradiction.
+        """
+        return self.fish(cands, queue, stats, 3, 'swordfish')
+
+    def fish(self,
+             cands: Candidates,
+             queue: List[int],
+             stats: Dict[Text, int],
+             n: int,
+             rule: Text
+            ) -> Optional[bool]:
+        """
+        For each value, look for n rows whose places for it all
+        lie in n columns, and remove it from the other cells of
+        those columns (then the same with rows and columns
+        swapped).  Counted in stats under rule.
+        Return True if anything changed, None on a contradiction.
+        """
+        changed = False
+        # Places of each value in each row (as a mask of
+        # columns) and each column (as a mask of rows)
+        size = self.size
+        in_rows = [[0] * size for _ in range(size + 1)]
+        in_cols = [[0] * size for _ in range(size + 1)]
+        for i, mask in enumerate(cands):
+            row, col = self.row_of[i], self.col_of[i]
+            for value in iter_values(mask):
+                in_rows[value][row] |= 1 << col
+                in_cols[value][col] |= 1 << row
+        for value in range(1, size + 1):
+            bit = 1 << value
+            for places, line_of, crosses in (
+                    (in_rows[value], self.row_of, self.cols),
+                    (in_cols[value], self.col_of, self.rows)):
+                # Lines with 2 to n places left
+                bases = [
+                         (k, where)
+                         for k, where in enumerate(places)
+                         if 2 <= where.bit_count() <= n
+                        ]
+                for fish in itertools.combinations(bases, n):
+                    cover = 0
+                    for _, where in fish:
+                        cover |= where
+                    if cover.bit_count() != n:
+                        continue
+                    base = [k for k, _ in fish]
+                    for x in iter_values(cover << 1):
+                        for j in crosses[x - 1]:
+                            if line_of[j] not in base and cands[j] & bit:
+                                if not self.eliminate(cands, j, bit, queue):
+                                    return None
+                                stats[rule] += 1
+                                changed = True
+        return changed
+
+    def coloring(self,
+                 cands: Candidates,
+                 queue: List[int],
+                 stats: Dict[Text, int]
+                ) -> Optional[bool]:
+        """
+        Simple coloring.  For each value, link the two cells of
+        every unit where it has only two places left, and color
+        each chain of links alternately: one of the two colors
+        holds the value.  If two cells of one color see each
+        other, that color is wrong, so remove the value from it;
+        and remove the value from any other cell that sees both
+        colors.  Return True if anything changed, None on a
+        contradiction.
+        """
+        # Links for each value: the units where it has
+        # exactly two places, both unsolved cells
+        links_of = {}
+        for unit in self.units:
+            once = twice = thrice = 0
+            for i in unit:
+                mask = cands[i]
+                thrice |= twice & mask
+                twice |= once & mask
+                once |= mask
+            for value in iter_values(twice & ~thrice):
+                bit = 1 << value
+                a, b = [i for i in unit if cands[i] & bit]
+                if cands[a] != bit and cands[b] != bit:
+                    links = links_of.setdefault(value, {})
+                    links.setdefault(a, []).append(b)
+                    links.setdefault(b, []).append(a)
+        for value, links in links_of.items():
+            bit = 1 << value
+            color = {}
+            for start in links:
+                if start in color:
+                    continue
+                # Color one chain, two colors alternately
+                color[start] = 0
+                chain = [[start], []]
+                stack = [start]
+                while stack:
+                    i = stack.pop()
+                    for j in links[i]:
+                        if j not in color:
+                            color[j] = 1 - color[i]
+                            chain[color[j]].append(j)
+                            stack.append(j)
+                if len(chain[0]) + len(chain[1]) < 3:
+                    continue
+                chained = set(chain[0]) | set(chain[1])
+                # Color wrap: two cells of one color see each other
+                for side in (0, 1):
+                    cells = chain[side]
+                    if any(b in self.peer_sets[a]
+                           for a, b in itertools.combinations(cells, 2)):
+                        for i in cells:
+                            if not self.eliminate(cands, i, bit, queue):
+                                return None
+                            stats['coloring'] += 1
+                        return True
+                # Color trap: a cell outside the chain seeing both colors
+                changed = False
+                for i in range(len(cands)):
+                    if (cands[i] & bit and i not in chained and
+                        any(j in self.peer_sets[i] for j in chain[0]) and
+                        any(j in self.peer_sets[i] for j in chain[1])):
+                        if not self.eliminate(cands, i, bit, queue):
+                            return None
+                        stats['coloring'] += 1
+                        changed = True
+                if changed:
+                    return True
+        return False
+
+    def search(self,
+               cands: Candidates,
+               stats: Optional[Dict[Text, int]] =None,
+               queue: Optional[List[int]] =None,
+               guess_limit: Optional[int] =None,
+               deadline: Optional[float] =None,
+               probe: Optional[Probe] =None
+              ) -> Optional[Candidates]:
+        """
+        Propagate, then guess on the unsolved cell with the
+        fewest candidates, propagating again after each guess,
+        and taking the value out (and propagating) after each
+        guess that fails.  Return the solved candidates, or
+        None if there is no solution.  Raise TimeoutError once
+        stats['guesses'] passes guess_limit, or once deadline
+        (a time.perf_counter() time) has passed.
+        probe (if given) counts the cells guessed on (calls),
+        guesses (placements) and guesses that failed.
+        """
+        if stats is None:
+            stats = new_stats(self.rules)
+        if not self.propagate(cands, queue, stats):
+            return None
+        # No recursion (so no depth limit, even on 36 x 36 boards):
+        # one frame per guess being followed, (candidates before
+        # the guess, cell guessed on, value guessed as a bit)
+        frames = []
+        while True:
+            best = self.branch_cell(cands)
+            # Every cell solved
+            if best is None:
+                return cands
+            if probe is not None:
+                probe.calls += 1
+            bit = cands[best] & -cands[best]
+            stats['guesses'] += 1
+            if guess_limit is not None and stats['guesses'] > guess_limit:
+                raise TimeoutError(f'search passed {guess_limit} guesses')
+            if deadline is not None and time.perf_counter() >= deadline:
+                raise TimeoutError('search passed its deadline')
+            if probe is not None:
+                probe.node(self, len(frames) + 1)
+            guess = list(cands)
+            guess[best] = bit
+            if self.propagate(guess, [best], stats):
+                frames.append((cands, best, bit))
+                cands = guess
+                continue
+            # A guess that fails is a deduction: the value can be
+            # taken out of the cell, and the board propagated again
+            # (a cell left with one value needs no guess).  If that
+            # fails too, the guess before it was wrong, and so on.
+            while True:
+                if probe is not None:
+                    probe.backtracks += 1
+                refuted = list(cands)
+                queue = []
+                if self.eliminate(refuted, best, bit, queue):
+                    if self.propagate(refuted, queue, stats):
+                        cands = refuted
+                        break
+                if not frames:
+                    return None
+                cands, best, bit = frames.pop()
+
+    def branch_cell(self,
+                    cands: Candidates
+                   ) -> Optional[int]:
+        """
+        The unsolved cell with the fewest candidates, ties
+        going to the cell with the most unsolved peers, or
+        None if every cell is solved.
+        """
+        best = None
+        best_key = None
+        for i, mask in enumerate(cands):
+            count = mask.bit_count()
+            if count > 1 and (best_key is None or count <= best_key[0]):
+                key = (count, -sum(1 for j in self.peers[i]
+                                   if cands[j] & (cands[j] - 1)))
+                if best_key is None or key < best_key:
+                    best, best_key = i, key
+        return best
+
+    def solve(self,
+              board: List[List[Any]],
+              stats: Optional[Dict[Text, int]] =None,
+              values: Optional[Dict[Any, int]] =None,
+              max_nodes: Optional[int] =None,
+              deadline: Optional[float] =None,
+              probe: Optional[Probe] =None
+             ) -> bool:
+        """
+        Solve a board in place, returning True if solved.
+        If given, values maps tiles to values (as in candidates()),
+        and solved cells are filled with the matching tiles.
+        Raise TimeoutError (leaving the board as it was) after
+        max_nodes guesses, or once deadline has passed.
+        probe (if given) counts what search() does.
+        """
+        if stats is None:
+            stats = new_stats(self.rules)
+        guess_limit = None
+        if max_nodes is not None:
+            guess_limit = stats['guesses'] + max_nodes
+        solved = self.search(self.candidates(board, values), stats, None,
+                             guess_limit, deadline, probe)
+        if solved is None:
+            return False
+        tiles = None
+        if values is not None:
+            tiles = {value: tile for tile, value in values.items()}
+        row_of, col_of = self.row_of, self.col_of
+        for i, mask in enumerate(solved):
+            value = mask.bit_length() - 1
+            board[row_of[i]][col_of[i]] = (
+                tiles[value] if tiles is not None else value
+            )
+        return True
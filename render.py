@@ -0,0 +1,162 @@
+"""
+Jordan Pemberton
+Sudoku -- board rendering
+"""
+
+# Draws boards for the terminal without building the frame again for
+# every move.  The frame (column numbers, borders, row numbers) only
+# depends on the size and zone size, so it is made once for each and
+# shared (see template()), as a list of pieces: the fixed text between
+# cells, with a slot for each cell's 5 characters in between:
+#       [frame, cell 0, frame, cell 1, ..., cell n - 1, frame]
+# A Renderer copies the pieces into its own buffer, and set() writes a
+# cell's text into its slot (cell i is at 2 * i + 1) only if it has
+# changed.  The board is then written out with one join and one write.
+#
+# For a terminal client, redraw() writes the whole board once, then
+# after that only the cells that changed, each moved to in place with
+# ANSI cursor codes (the board is drawn at the top of the screen).
+
+
+from typing import Optional, TextIO, Tuple
+import sys
+
+# Characters per cell
+CELL_WIDTH = 5
+
+# Templates made so far, by (size, zone size)
+_templates = {}
+
+# Pieces of the frame, the (line, column) of each cell's slot in the
+# drawn board, and how many lines the board takes
+Template = Tuple[Tuple[str, ...], Tuple[Tuple[int, int], ...], int]
+
+
+def template(size: int,
+             zone_size: int
+            ) -> Template:
+    """
+    The frame of a board of size and zone size, made on
+    first use.
+    """
+    key = (size, zone_size)
+    if key in _templates:
+        return _templates[key]
+    thick_vert = '|'
+    thin_vert =  ':'
+    thick_horz = '-----'
+    thin_horz =  ' . . '
+    margin = '     '
+
+    def border(horz_of):
+        line = [margin]
+        for c in range(size):
+            line.append(thick_vert if c % zone_size == 0 else thin_vert)
+            line.append(horz_of(c))
+        line.append(thick_vert + '\n')
+        return ''.join(line)
+
+    # Column number labels
+    labels = [margin]
+    for col in range(size):
+        labels.append(str(col).rjust(4) + '  ')
+    labels.append('\n')
+
+    pieces = []
+    positions = []
+    text = ''.join(labels)
+    lines = 1
+    for row in range(size):
+        # Horizontal border row, then the row number label
+        horz = thick_horz if row % zone_size == 0 else thin_horz
+        text += border(lambda c: horz)
+        text += str(row).rjust(3) + '  '
+        lines += 1
+        for c in range(size):
+            text += thick_vert if c % zone_size == 0 else thin_vert
+            positions.append((lines, len(margin) + c * (CELL_WIDTH + 1) + 1))
+            pieces.append(text)
+            pieces.append(' ' * CELL_WIDTH)
+            text = ''
+        text += thick_vert + '\n'
+        lines += 1
+    # Bottom border
+    text += border(lambda c: thick_horz)
+    lines += 1
+    pieces.append(text)
+    _templates[key] = (tuple(pieces), tuple(positions), lines)
+    return _templates[key]
+
+
+class Renderer:
+    """
+    A drawn board of one size, updated cell by cell.
+    """
+    def __init__(self,
+                 size: int,
+                 zone_size: int
+                ) -> None:
+        """
+        Start with every cell blank.
+        """
+        pieces, self.positions, self.lines = template(size, zone_size)
+        self.buffer = list(pieces)
+        # Cells changed since the board was last written
+        self.changed = set()
+        # Whether redraw() has drawn the whole board yet
+        self.drawn = False
+
+    def set(self,
+            cell: int,
+            text: str
+           ) -> None:
+        """
+        Put text (CELL_WIDTH characters) in cell, a flat index.
+        """
+        slot = 2 * cell + 1
+        if self.buffer[slot] != text:
+            self.buffer[slot] = text
+            self.changed.add(cell)
+
+    def text(self) -> str:
+        """
+        The whole board, as drawn.
+        """
+        return ''.join(self.buffer)
+
+    def write(self,
+              out: Optional[TextIO] =None
+             ) -> str:
+        """
+        Write the whole board (and a blank line) to out
+        (stdout if not given) in one go, returning the board.
+        """
+        text = self.text()
+        (out or sys.stdout).write(text + '\n')
+        self.changed.clear()
+        return text
+
+    def redraw(self,
+               out: Optional[TextIO] =None
+              ) -> None:
+        """
+        Update the board on a terminal in place: clear the
+        screen and draw it at the top the first time, then
+        only rewrite the cells that changed.  Either way, the
+        cursor is left on the line below the board, with the
+        rest of the screen cleared.
+        """
+        out = out or sys.stdout
+        if not self.drawn:
+            out.write('\x1b[H\x1b[2J' + self.text() + '\n')
+            self.drawn = True
+        else:
+            codes = [
+                     f'\x1b[{line + 1};{col + 1}H' + self.buffer[2 * cell + 1]
+                     for cell in sorted(self.changed)
+                     for line, col in (self.positions[cell],)
+                    ]
+            codes.append(f'\x1b[{self.lines + 2};1H\x1b[J')
+            out.write(''.join(codes))
+        out.flush()
+        self.changed.clear()
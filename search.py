@@ -0,0 +1,388 @@
+"""
+Jordan Pemberton
+Sudoku -- iterative backtracking search
+"""
+
+# The same backtracking as the recursive solvers, but with an explicit
+# stack of frames, one per filled cell:
+#       [row, col, zone, candidates left to try, bit placed (0 if none), i]
+# (i is the cell's place in the empties list, used by MRV order).
+# Empty cells are kept as flat indexes (see layout.py).
+# ZoneSearch uses the same frames to fill a board zone by zone.
+# Without recursion there is no frame overhead per cell and no depth
+# limit, so 25 x 25 boards are safe, and because all of the state is
+# kept on the Search object a search can stop after a number of nodes
+# and pick up again later where it left off.  A deadline works the
+# same way, checked every few dozen nodes so the clock is not read
+# at every step.  luby() gives the node budgets for restart schedules:
+# backtracking run times are heavy-tailed, so starting over with a
+# growing budget cuts the long runs short without giving up on slow
+# but good ones.
+# A Probe (see probe.py) can be passed in to count what a search does;
+# with none, the only cost is one test per step.
+
+
+from typing import Any, Dict, List, Optional, Sequence
+import time
+from constraints import Constraints
+from probe import Probe
+
+# Nodes between checks of the clock against a deadline
+CLOCK_EVERY = 64
+
+
+def luby(i: int) -> int:
+    """
+    The i-th term (from 1) of the Luby sequence:
+    1 1 2 1 1 2 4 1 1 2 1 1 2 4 8 ...
+    """
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class Search:
+    """
+    Resumable iterative backtracking search over one board.
+    """
+    def __init__(self,
+                 size: int,
+                 board: List[List[Any]],
+                 constraints: Optional[Constraints] =None,
+                 mrv: bool =False,
+                 start: int =0,
+                 values: Optional[Dict[Any, int]] =None,
+                 tiles: Optional[Sequence[Any]] =None,
+                 empties: Optional[List[int]] =None,
+                 probe: Optional[Probe] =None
+                ) -> None:
+        """
+        Set up a search that fills board in place.
+        Cells are tried in row-major order from flat index start
+        on, or, if mrv is True, most constrained cell first.
+        If given, values maps the tiles on board to values and
+        tiles[v - 1] is written for value v, otherwise board
+        holds ints.  constraints are the board's masks, and
+        empties its empty cells as flat indexes (both found if
+        not given).
+        probe (if given) counts what the search does.
+        """
+        self.size = size
+        self.board = board
+        if constraints is None:
+            constraints = Constraints.from_board(size, board, values)
+        self.constraints = constraints
+        self.layout = constraints.layout
+        self.mrv = mrv
+        self.tiles = tiles
+        self.probe = probe
+        if empties is None:
+            row_of, col_of = self.layout.row_of, self.layout.col_of
+            empties = [
+                       i
+                       for i in range(start, size * size)
+                       if board[row_of[i]][col_of[i]] is None
+                      ]
+        self.empties = empties
+        # Row-major order walks the empties list without changing it
+        self.frames = []
+        # True while moving forward to a new cell, False while
+        # backing up to the last cell with values left to try
+        self.advancing = True
+        # Set once the search has finished, either way
+        self.result = None
+        # Total values placed, and times the search has backed
+        # up from a dead end (a cell with no values left)
+        self.nodes = 0
+        self.backtracks = 0
+
+    def push(self) -> Optional[bool]:
+        """
+        Add a frame for the next cell to fill.  Return True if
+        the board is full, False if the chosen cell has no
+        values left, else None.
+        """
+        empties = self.empties
+        constraints = self.constraints
+        if self.mrv:
+            if not empties:
+                return True
+            if self.probe is not None:
+                self.probe.checks += len(empties)
+            i, mask = constraints.most_constrained(empties)
+            if not mask:
+                return False
+            cell = empties[i]
+            empties[i] = empties[-1]
+            empties.pop()
+        else:
+            i = len(self.frames)
+            if i == len(empties):
+                return True
+            cell = empties[i]
+            mask = constraints.candidates_at(cell)
+            if self.probe is not None:
+                self.probe.checks += 1
+        tables = self.layout
+        self.frames.append([tables.row_of[cell], tables.col_of[cell],
+                            tables.zone_of[cell], mask, 0, i])
+        return None
+
+    def pop(self) -> None:
+        """
+        Drop the last frame, emptying its cell.
+        """
+        row, col, _, _, _, i = self.frames.pop()
+        self.board[row][col] = None
+        if self.mrv:
+            # Put the cell back in its place in empties
+            empties = self.empties
+            empties.append(self.layout.index[row][col])
+            empties[i], empties[-1] = empties[-1], empties[i]
+
+    def unwind(self) -> None:
+        """
+        Take back every value the search has placed, leaving
+        the board and its masks as they were to start with,
+        ready to run() again from the beginning.
+        """
+        constraints = self.constraints
+        frames = self.frames
+        while frames:
+            row, col, zone, _, bit, _ = frames[-1]
+            if bit:
+                constraints.rows[row] ^= bit
+                constraints.cols[col] ^= bit
+                constraints.zones[zone] ^= bit
+            self.pop()
+        self.advancing = True
+        self.result = None
+
+    def run(self,
+            max_nodes: Optional[int] =None,
+            deadline: Optional[float] =None
+           ) -> Optional[bool]:
+        """
+        Search until the board is solved (True) or shown to
+        have no solution (False), or, if max_nodes is given,
+        until that many more values have been placed, or, if
+        deadline (a time.perf_counter() time) is given, until
+        then (None, call run() again to carry on, or unwind()).
+        After a solution, run() again backs up and looks for
+        the next one.
+        """
+        constraints = self.constraints
+        rows, cols, zones = constraints.rows, constraints.cols, constraints.zones
+        board = self.board
+        tiles = self.tiles
+        frames = self.frames
+        push = self.push
+        probe = self.probe
+        if self.result is not None:
+            # Solved before: back up for the next solution
+            if not self.result or not frames:
+                self.result = False
+                return False
+            self.result = None
+            self.advancing = False
+        budget = max_nodes
+        nodes = 0
+        backtracks = 0
+        while True:
+            if self.advancing:
+                full = push()
+                if probe is not None:
+                    probe.calls += 1
+                if full:
+                    self.nodes += nodes
+                    self.backtracks += backtracks
+                    self.result = True
+                    return True
+                if full is not None:
+                    self.advancing = False
+                    backtracks += 1
+                    if probe is not None:
+                        probe.backtracks += 1
+                    if not frames:
+                        self.nodes += nodes
+                        self.backtracks += backtracks
+                        self.result = False
+                        return False
+                    continue
+            frame = frames[-1]
+            row, col, zone, mask, bit, _ = frame
+            # Take back the value tried last (its bit is
+            # set in all three masks, so xor clears it)
+            if bit:
+                rows[row] ^= bit
+                cols[col] ^= bit
+                zones[zone] ^= bit
+            if mask:
+                # Next candidate: lowest bit left in the mask
+                bit = mask & -mask
+                frame[3] = mask ^ bit
+                frame[4] = bit
+                rows[row] |= bit
+                cols[col] |= bit
+                zones[zone] |= bit
+                value = bit.bit_length() - 1
+                board[row][col] = tiles[value - 1] if tiles is not None else value
+                nodes += 1
+                self.advancing = True
+                if probe is not None:
+                    probe.node(self, len(frames))
+                if ((budget is not None and nodes >= budget) or
+                    (deadline is not None and not nodes % CLOCK_EVERY and
+                     time.perf_counter() >= deadline)):
+                    self.nodes += nodes
+                    self.backtracks += backtracks
+                    return None
+            else:
+                # Out of values, back up
+                frame[4] = 0
+                self.pop()
+                self.advancing = False
+                backtracks += 1
+                if probe is not None:
+                    probe.backtracks += 1
+                if not frames:
+                    self.nodes += nodes
+                    self.backtracks += backtracks
+                    self.result = False
+                    return False
+
+
+class ZoneSearch(Search):
+    """
+    Iterative backtracking search that fills a board one zone
+    at a time, in a given order of zones, backing up into
+    earlier zones when a zone cannot be completed.
+    """
+    def __init__(self,
+                 size: int,
+                 board: List[List[Any]],
+                 zone_order: Sequence[int],
+                 constraints: Optional[Constraints] =None,
+                 values: Optional[Dict[Any, int]] =None,
+                 tiles: Optional[Sequence[Any]] =None,
+                 probe: Optional[Probe] =None
+                ) -> None:
+        """
+        Set up a search that fills board in place, zone by zone
+        in zone_order (zone numbers, as Constraints.zone_of()).
+        Within a zone, the cell with the fewest candidates
+        goes first.  Zones left out of zone_order are not filled.
+        values, tiles, constraints and probe are as for Search.
+        """
+        super().__init__(size, board, constraints, mrv=False,
+                         values=values, tiles=tiles, empties=[],
+                         probe=probe)
+        z = self.constraints.zone_size
+        tables = self.layout
+        self.zone_order = list(zone_order)
+        # Empty cells of each zone, and rows / columns it spans
+        self.zone_cells = {}
+        self.zone_lines = {}
+        for zone in self.zone_order:
+            top = zone - zone % z
+            left = zone % z * z
+            self.zone_lines[zone] = (range(top, top + z), range(left, left + z))
+            self.zone_cells[zone] = [
+                                     i
+                                     for i in tables.zones[zone]
+                                     if board[tables.row_of[i]][tables.col_of[i]] is None
+                                    ]
+        # Place in zone_order of the first zone with empty cells
+        self.current = 0
+
+    def zone_masks(self,
+                   zone: int
+                  ) -> Optional[List[int]]:
+        """
+        Candidate masks of a zone's empty cells, found from the
+        values still allowed in each of its rows and columns.
+        Return None if the zone cannot be completed: some cell
+        has no candidates, or some missing value has no cell.
+        """
+        constraints = self.constraints
+        free = constraints.full & ~constraints.zones[zone]
+        rows, cols = self.zone_lines[zone]
+        row_free = {r: free & ~constraints.rows[r] for r in rows}
+        col_free = {c: free & ~constraints.cols[c] for c in cols}
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        masks = []
+        union = 0
+        for cell in self.zone_cells[zone]:
+            mask = row_free[row_of[cell]] & col_free[col_of[cell]]
+            if not mask:
+                return None
+            masks.append(mask)
+            union |= mask
+        if union != free:
+            return None
+        return masks
+
+    def push(self) -> Optional[bool]:
+        """
+        Add a frame for the next cell: a forced cell anywhere
+        on the board if there is one (one candidate left, or the
+        last place for a value in a unit), else the most
+        constrained cell of the first zone with empty cells.
+        Return True if all zones are full, False on a dead end
+        (found anywhere on the board), else None.
+        """
+        order = self.zone_order
+        zone_cells = self.zone_cells
+        k = self.current
+        while k < len(order) and not zone_cells[order[k]]:
+            k += 1
+        if k == len(order):
+            return True
+        zone = order[k]
+        cells = zone_cells[zone]
+        self.current = k
+        # Forced cells anywhere on the board go first
+        empties = [cell for later in order[k:] for cell in zone_cells[later]]
+        if self.probe is not None:
+            self.probe.checks += len(empties)
+        j, mask = self.constraints.most_constrained(empties)
+        if not mask:
+            return False
+        tables = self.layout
+        if not mask & (mask - 1):
+            cell = empties[j]
+            zone = tables.zone_of[cell]
+            cells = zone_cells[zone]
+            i = cells.index(cell)
+            cells[i] = cells[-1]
+            cells.pop()
+            self.frames.append([tables.row_of[cell], tables.col_of[cell],
+                                zone, mask, 0, i])
+            return None
+        masks = self.zone_masks(zone)
+        if masks is None:
+            return False
+        if self.probe is not None:
+            self.probe.checks += len(masks)
+        # Fewest candidates first
+        i = min(range(len(masks)), key=lambda j: masks[j].bit_count())
+        cell = cells[i]
+        cells[i] = cells[-1]
+        cells.pop()
+        self.frames.append([tables.row_of[cell], tables.col_of[cell],
+                            zone, masks[i], 0, i])
+        return None
+
+    def pop(self) -> None:
+        """
+        Drop the last frame, emptying its cell and
+        putting it back with its zone's empty cells.
+        """
+        row, col, zone, _, _, i = self.frames.pop()
+        self.board[row][col] = None
+        cells = self.zone_cells[zone]
+        cells.append(self.layout.index[row][col])
+        cells[i], cells[-1] = cells[-1], cells[i]
+        self.current = min(self.current, self.zone_order.index(zone))
@@ -1,64 +1,89 @@
+import argparse
+import collections
 import math
+import multiprocessing
 import os
+import random
 import sys
-
-
-def solve(size, board, row, col):
-    # If end of board reached
-    if row == size - 1 and col == size:
-        return True
-
-    # If end of row reached
-    if col == size:
-        row += 1
-        col = 0
-
-    # If cell already filled
-    if board[row][col] is not None:
-        return solve(size, board, row, col+1)
-
-    # guess
-    for x in range(1, size+1):
-        if check_if_valid_entry(size, board, row, col, x):
-            board[row][col] = x
-
-            if solve(size, board, row, col+1):
-                return True
-
-        board[row][col] = None
-
-    return False
-
-
-def check_if_valid_entry(size, board, row, col, entry):
-    # Check column
-    for c in range(size):
-        if board[row][c] == entry:
-            if c != col:
-                return False
-
-    # Check row
-    for r in range(size):
-        if board[r][col] == entry:
-            if r != row:
-                return False
-
-    # Check zone
-    zone_size = int(math.sqrt(size))
-    start_row = row - row % zone_size
-    start_col = col - col % zone_size
-
-    for r in range(start_row, start_row + zone_size):
-        for c in range(start_col, start_col + zone_size):
-            if board[r][c] == entry:
-                if (r, c) != (row, col):
-                    return False
-
-    return True
-
-
-
-def test( testid, size, clues, solu ):
+import time
+
+from canonical import Deduplicator, canonical, dedup, fingerprint
+from constraints import Constraints
+from dlx import DancingLinks
+from engine import BACKENDS, Game, generate
+from grading import Grader
+from grid import Grid
+from layout import layout
+from playstate import PlayState
+from propagation import new_stats
+from search import Search
+
+
+# Every way to solve a board:
+#       backtrack   row-major backtracking
+#       mrv         most-constrained-cell backtracking
+# and the backends (see engine.py)
+METHODS = ('backtrack', 'mrv') + tuple(BACKENDS)
+
+# Graders by board size, made on first use in each process
+GRADERS = {}
+
+
+def solve(size, board, row, col, constraints=None, method='backtrack',
+          stats=None, probe=None, max_nodes=None, deadline=None):
+    # Give up after max_nodes nodes (guesses for the backends) or
+    # at deadline (a time.perf_counter() time), if given, leaving
+    # the board as it was and returning None
+    #
+    # Hand off to a backend, which counts what it did in stats
+    if method in BACKENDS:
+        try:
+            return BACKENDS[method](size).solve(board, stats, None,
+                                                max_nodes, deadline, probe)
+        except TimeoutError:
+            return None
+
+    # Row, column and zone masks, built once and then
+    # updated as tiles are placed and taken back
+    if constraints is None:
+        constraints = Constraints.from_board(size, board)
+
+    # Iterative search (no recursion, so no depth limit), in
+    # most-constrained-cell order or row-major order from (row, col),
+    # counting the values it placed and the times it backed up
+    # (and anything else probe counts, if given)
+    search = Search(size, board, constraints, mrv=(method == 'mrv'),
+                    start=row * size + col, probe=probe)
+    solved = search.run(max_nodes, deadline)
+    if solved is None:
+        search.unwind()
+    if stats is not None:
+        stats['nodes'] = search.nodes
+        stats['backtracks'] = search.backtracks
+    return solved
+
+
+def count_solutions(board, limit=None, values=None, stats=None):
+    # Enumerate with Dancing Links, stopping at limit (if given),
+    # so limit=2 is a cheap check for a unique solution
+    return DancingLinks(len(board)).count(board, limit, values, stats)
+
+
+def encode_board(board):
+    # Board of values (None for empty) -> compact string
+    return Grid.from_rows(board).to_string()
+
+
+def decode_board(text):
+    # Compact string -> board of values (None for empty)
+    return Grid.from_string(text).to_rows()
+
+
+
+def test( testid, size, clues, num_solu, solu, method='backtrack',
+          at_least=False ):
+    # at_least: num_solu is only a lower bound on the number of
+    # solutions (written as 2+ and so on, when counting stopped)
     # clues = "6...5.....73..8.2.854.27...2.17..53.4...69..7.8....9...273.1.84.6.54...93.......1"
     # solu  = "612453798973618425854927163291784536435269817786135942527391684168542379349876251"
     # size = 9
@@ -71,44 +96,469 @@ def test( testid, size, clues, solu ):
         if clues[i] != '.':
             board[i//size][i%size] = int(clues[i])
 
-    print( solve(size, board, 0, 0) )
+    clue_board = [row[:] for row in board]
+
+    stats = new_stats()
+    solved = solve(size, board, 0, 0, method=method, stats=stats)
+    print( solved )
+    if method in BACKENDS:
+        print( f"stats:\t{ {k: v for k, v in stats.items() if v} }" )
 
     print( f"clues:\t{clues}" )
     print( f"result:\t{board}" )
     print( f"expected:\t{solu}" )
 
     correct = True
-    for i in range( size * size ):
-        exp = 0
-        if solu[i] != '.':
-            exp = int( solu[i] )
 
-        if exp != board[i//size][i%size]:
-            print( f"failed at index\t{i}\texp: {exp}\t res: {board[i//size][i%size]}" )
+    # Check the number of solutions (only up to the
+    # lower bound, if that is all there is)
+    found = count_solutions(clue_board, num_solu if at_least else None)
+    plus = "+" if at_least else ""
+    print( f"count:\t{found}{plus}\texpected:\t{num_solu}{plus}" )
+    if found != num_solu:
+        print( f"failed count\texp: {num_solu}\t res: {found}" )
+        correct = False
+
+    # No solution: the solver must give up
+    if num_solu == 0:
+        if solved:
+            print( "failed\tsolved a board with no solution" )
+            correct = False
+
+    # Many solutions: any full, valid board that keeps the clues
+    elif num_solu > 1 or at_least:
+        if (not solved or
+            not Constraints.from_board(size, board).is_complete() or
+            any(clue_board[i//size][i%size] not in (None, board[i//size][i%size])
+                for i in range( size * size ))):
+            print( "failed\tresult is not a solution" )
             correct = False
 
+    # One solution: must match it
+    else:
+        for i in range( size * size ):
+            exp = 0
+            if solu[i] != '.':
+                exp = int( solu[i] )
+
+            if exp != board[i//size][i%size]:
+                print( f"failed at index\t{i}\texp: {exp}\t res: {board[i//size][i%size]}" )
+                correct = False
+
     if correct:
         print( f"test\t{testid}\tPASSED" )
     else:
         print( f"teste\t{testid}\tFAILED" )
 
 
+def solve_line(line, method="dlx"):
+    # Solve the clues of one clues[:count:solution] line, giving
+    # the solution as a compact string (all '.' if there is none)
+    clues = line.strip().split(":")[0]
+    board = decode_board(clues)
+    size = len(board)
+
+    if solve(size, board, 0, 0, method=method):
+        return encode_board(board)
+    return "." * (size * size)
+
+
+def solve_chunk(task):
+    lines, method = task
+    return [solve_line(line, method) for line in lines]
+
+
+def grade_line(line):
+    # Grade the clues of one clues[:count:solution] line, giving
+    # clues:band:hardest technique:score (band 'none' if there
+    # is no solution)
+    clues = line.strip().split(":")[0]
+    board = decode_board(clues)
+    size = len(board)
+    if size not in GRADERS:
+        GRADERS[size] = Grader(size)
+
+    grade = GRADERS[size].grade(board)
+    if grade is None:
+        return f"{clues}:none::0"
+    hardest, band, score = grade
+    return f"{clues}:{band}:{hardest or ''}:{score}"
+
+
+def grade_chunk(task):
+    lines, _ = task
+    return [grade_line(line) for line in lines]
+
+
+def read_chunks(infile, chunk_size):
+    # Read lines lazily, chunk_size (non-blank) lines at a time
+    chunk = []
+    for line in infile:
+        if not line.strip():
+            continue
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_batch(infile, outfile, method="dlx", workers=1, chunk_size=100,
+                max_in_flight=None, work=solve_chunk):
+    # Solve every line of infile across a pool of workers, writing
+    # the solutions to outfile in input order.  At most max_in_flight
+    # chunks are handed out at once, so memory stays constant
+    # however long the input is.  work does one chunk (grade_chunk
+    # grades instead of solving).
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+
+    count = 0
+    start = time.perf_counter()
+
+    if workers == 1:
+        for chunk in read_chunks(infile, chunk_size):
+            solutions = work((chunk, method))
+            outfile.write("\n".join(solutions) + "\n")
+            count += len(solutions)
+
+    else:
+        in_flight = collections.deque()
+        with multiprocessing.Pool(workers) as pool:
+            for chunk in read_chunks(infile, chunk_size):
+                in_flight.append(pool.apply_async(work, ((chunk, method),)))
+
+                # Wait on the oldest chunk once enough are out
+                if len(in_flight) >= max_in_flight:
+                    solutions = in_flight.popleft().get()
+                    outfile.write("\n".join(solutions) + "\n")
+                    count += len(solutions)
+
+            while in_flight:
+                solutions = in_flight.popleft().get()
+                outfile.write("\n".join(solutions) + "\n")
+                count += len(solutions)
+
+    outfile.flush()
+    return count, time.perf_counter() - start
+
+
+def rescan(size, values):
+    # Conflicts, conflicting cells, whether solved and the candidates
+    # of a flat list of values (0 for empty), worked out from scratch
+    tables = layout(size)
+    conflicts = 0
+    for unit in tables.units:
+        filled = [values[i] for i in unit if values[i]]
+        conflicts += len(filled) - len(set(filled))
+    conflicting = set(
+                      i
+                      for i in range(size * size)
+                      if values[i] and any(values[j] == values[i]
+                                           for j in tables.peers[i])
+                     )
+    cands = []
+    for i in range(size * size):
+        mask = 0
+        if not values[i]:
+            mask = ((1 << size) - 1) << 1
+            for j in tables.peers[i]:
+                mask &= ~(1 << values[j])
+        cands.append(mask)
+    solved = all(values) and not conflicts
+    return conflicts, conflicting, solved, cands
+
+
+def check_play_state(seed, steps=2000):
+    # Make random moves on a PlayState, starting from a solved
+    # board, and check its conflicts, is_solved() and candidates
+    # against a full rescan after every one.  Most moves put
+    # back the solution's value, so the board is solved now and
+    # then.  Returns the number of sizes that failed.
+    failures = 0
+    for size in (4, 9):
+        rng = random.Random(f"{seed}:play_state:{size}")
+        _, solution = generate(size, size * size, seed=rng.randrange(1 << 32))
+        answer = [value for row in solution for value in row]
+        values = answer[:]
+        state = PlayState(size, solution)
+        solved = 0
+        for step in range(steps + 1):
+            conflicts, conflicting, is_solved, cands = rescan(size, values)
+            problem = None
+            if state.conflicts != conflicts:
+                problem = f"conflicts {state.conflicts}, rescan {conflicts}"
+            elif set(state.conflicting_cells()) != conflicting:
+                problem = "conflicting cells differ"
+            elif state.is_solved() != is_solved:
+                problem = f"is_solved() {state.is_solved()}, rescan {is_solved}"
+            else:
+                for i in range(size * size):
+                    if state.candidates(i) != cands[i]:
+                        problem = (f"candidates of {i} {state.candidates(i)}, "
+                                   f"rescan {cands[i]}")
+                        break
+            if problem is not None:
+                print(f"failed	play_state	size {size}	step {step}	{problem}")
+                failures += 1
+                break
+            solved += is_solved
+
+            cell = rng.randrange(size * size)
+            move = rng.random()
+            if move < 0.6:
+                values[cell] = answer[cell]
+                state.place(cell, answer[cell])
+            elif move < 0.8:
+                values[cell] = rng.randint(1, size)
+                state.place(cell, values[cell])
+            else:
+                values[cell] = 0
+                state.remove(cell)
+        else:
+            print(f"play_state	size {size}	{steps} moves	"
+                  f"solved {solved} times")
+    return failures
+
+
+def random_symmetry(grid, rng):
+    # A copy of grid with its values relabeled, its bands and the
+    # rows within each band shuffled, the same for its stacks and
+    # columns, and transposed half of the time
+    size = grid.size
+    z = math.isqrt(size)
+    rows = [band * z + r
+            for band in rng.sample(range(z), z)
+            for r in rng.sample(range(z), z)]
+    cols = [stack * z + c
+            for stack in rng.sample(range(z), z)
+            for c in rng.sample(range(z), z)]
+    labels = [0] + rng.sample(range(1, size + 1), size)
+    transpose = rng.random() < 0.5
+    cells = bytearray(size * size)
+    for r in range(size):
+        for c in range(size):
+            if transpose:
+                i = cols[c] * size + rows[r]
+            else:
+                i = rows[r] * size + cols[c]
+            cells[r * size + c] = labels[grid[i]]
+    return Grid(size, cells)
+
+
+def check_canonical(seed, rounds=50):
+    # Make seeded puzzles, and check that each has the same
+    # fingerprint and canonical form as a copy put through a random
+    # symmetry, and that a Deduplicator drops the copy.  Returns
+    # the number of puzzles that failed.
+    failures = 0
+    for size, clues in ((4, 6), (9, 24)):
+        rng = random.Random(f"{seed}:canonical:{size}")
+        for _ in range(rounds):
+            puzzle, _ = generate(size, clues, seed=rng.randrange(1 << 32))
+            grid = Grid.from_rows(puzzle)
+            copy = random_symmetry(grid, rng)
+            deduplicator = Deduplicator()
+            problem = None
+            if fingerprint(grid) != fingerprint(copy):
+                problem = "fingerprints differ"
+            elif canonical(grid) != canonical(copy):
+                problem = "canonical forms differ"
+            elif not deduplicator.add(grid) or deduplicator.add(copy):
+                problem = "copy not dropped as a duplicate"
+            if problem is not None:
+                print(f"failed\tcanonical\tsize {size}\t{grid.to_string()}\t"
+                      f"{copy.to_string()}\t{problem}")
+                failures += 1
+        print(f"canonical\tsize {size}\t{rounds} puzzles")
+    return failures
+
+
+def check_timeout(seed, rounds=10):
+    # Stop every solver with a tiny node budget, through solve()
+    # and Game.solve_board(), and make_boards() with a tiny timeout,
+    # and check that each one that gives up leaves the board (and
+    # its masks, and the game's boards) as they were.  Returns the
+    # number of failures.
+    failures = 0
+    size = 9
+    rng = random.Random(f"{seed}:timeout")
+    game = Game(random.Random(rng.random()))
+    game.set_up_game(size, 30, unique=True)
+    timeouts = collections.Counter()
+
+    def fail(problem):
+        nonlocal failures
+        print(f"failed\ttimeout\t{problem}")
+        failures += 1
+
+    for _ in range(rounds):
+        puzzle, _ = generate(size, 12, seed=rng.randrange(1 << 32))
+        tiles = [[game.tiles[v - 1] if v else None for v in row]
+                 for row in puzzle]
+        for method in METHODS:
+            max_nodes = rng.randint(1, 4)
+            board = [row[:] for row in puzzle]
+            if solve(size, board, 0, 0, method=method,
+                     max_nodes=max_nodes) is None:
+                timeouts[method] += 1
+                if board != puzzle:
+                    fail(f"solve() {method} changed the board")
+
+            board = [row[:] for row in tiles]
+            constraints = Constraints.from_board(size, board, game.tile_values)
+            masks = (constraints.rows[:], constraints.cols[:],
+                     constraints.zones[:])
+            if game.solve_board(board, method=method, constraints=constraints,
+                                max_nodes=max_nodes) is None:
+                timeouts["Game " + method] += 1
+                if board != tiles:
+                    fail(f"solve_board() {method} changed the board")
+                if (constraints.rows, constraints.cols,
+                        constraints.zones) != masks:
+                    fail(f"solve_board() {method} changed the masks")
+
+        # A puzzle, then one with too few clues to make in time
+        game.how_many_start_tiles = 30
+        game.make_boards()
+        kept = (game.solution_board, game.starting_board, game.playing_board,
+                set(game.playing_board_empties), game.starting_cells)
+        game.how_many_start_tiles = 17
+        try:
+            game.make_boards(timeout=0.005)
+        except TimeoutError:
+            timeouts["make_boards"] += 1
+            if (game.solution_board, game.starting_board, game.playing_board,
+                    game.playing_board_empties, game.starting_cells) != kept:
+                fail("make_boards() changed the game's boards")
+
+    for name in list(METHODS) + ["Game " + method for method in METHODS]:
+        if not timeouts[name]:
+            fail(f"{name} never gave up")
+    print(f"timeout\t{dict(timeouts)}")
+    return failures
+
+
+def check(seed):
+    # Run every seeded self-check, printing PASSED or FAILED
+    # for each, and return the number that failed
+    failed = 0
+    for name, run in (("play_state", check_play_state),
+                      ("canonical", check_canonical),
+                      ("timeout", check_timeout)):
+        failures = run(seed)
+        print(f"check\t{name}\t{'FAILED' if failures else 'PASSED'}")
+        failed += bool(failures)
+    return failed
+
+
 if __name__ == '__main__':
-    if (len(sys.argv) < 2):
-        print("USAGE: python3 solve.py <testsfile>")
+    parser = argparse.ArgumentParser(
+        prog="solver.py",
+        description="Test the solvers against a tests file, solve "
+                    "a file of puzzles with --batch, grade them with "
+                    "--grade, drop duplicate puzzles with --dedup, "
+                    "or run seeded self-checks with --check.")
+    parser.add_argument("testsfile", nargs="?", default=None,
+                        help="clues:count:solution lines ('-' or none "
+                             "for stdin with --batch)")
+    methods = parser.add_mutually_exclusive_group()
+    for name in METHODS:
+        methods.add_argument("--" + name, dest="method", action="store_const",
+                             const=name, help=f"solve with {name}")
+    parser.add_argument("--batch", action="store_true",
+                        help="only solve, writing one solution per line "
+                             "(default solver: dlx)")
+    parser.add_argument("--grade", action="store_true",
+                        help="only grade, writing clues:band:hardest "
+                             "technique:score for each line")
+    parser.add_argument("--dedup", action="store_true",
+                        help="only keep the first line of each puzzle that "
+                             "is the same as another up to symmetry "
+                             "(relabeling, row / column / band / stack "
+                             "swaps, transposing)")
+    parser.add_argument("--check", action="store_true",
+                        help="run the seeded self-checks: random moves "
+                             "against a full rescan, canonical forms "
+                             "under random symmetries, and solvers that "
+                             "time out leaving boards as they were")
+    parser.add_argument("--seed", default="0",
+                        help="seed for --check (default: 0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for --batch and --grade "
+                             "(default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=100,
+                        help="lines per task handed to a worker")
+    parser.add_argument("--output", default=None,
+                        help="file for --batch solutions, --grade grades "
+                             "or --dedup lines (default: stdout)")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if check(args.seed) else 0)
+
+    elif args.dedup:
+        if args.testsfile in (None, "-"):
+            infile = sys.stdin
+        else:
+            infile = open(args.testsfile)
+        outfile = open(args.output, "w") if args.output else sys.stdout
+
+        deduplicator = Deduplicator()
+        start = time.perf_counter()
+        for line in dedup(infile, deduplicator):
+            outfile.write(line if line.endswith("\n") else line + "\n")
+        elapsed = time.perf_counter() - start
+
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+        rate = deduplicator.seen / elapsed if elapsed else float("inf")
+        print(f"kept {deduplicator.unique} of {deduplicator.seen} puzzles "
+              f"in {elapsed:.2f}s, {rate:.1f} puzzles/sec", file=sys.stderr)
+
+    elif args.batch or args.grade:
+        if args.testsfile in (None, "-"):
+            infile = sys.stdin
+        else:
+            infile = open(args.testsfile)
+        outfile = open(args.output, "w") if args.output else sys.stdout
+
+        count, elapsed = solve_batch(infile, outfile, args.method or "dlx",
+                                     max(1, args.workers),
+                                     max(1, args.chunk_size),
+                                     work=grade_chunk if args.grade else solve_chunk)
+
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+        rate = count / elapsed if elapsed else float("inf")
+        done = "graded" if args.grade else "solved"
+        print(f"{done} {count} puzzles in {elapsed:.2f}s, {rate:.1f} puzzles/sec",
+              file=sys.stderr)
+
+    elif args.testsfile is None:
+        parser.print_usage()
 
     else:
-        filename = sys.argv[1]
+        method = args.method or "backtrack"
 
-        infile = open(filename)
+        infile = open(args.testsfile)
 
         count = 1
 
-        for line in infile.readlines():
+        for line in infile:
             clues, num_solu, solu = line.split(":")
             size = int(math.sqrt( len(clues) ))
+            at_least = num_solu.endswith("+")
 
-            test(count, size, clues, solu)
+            test(count, size, clues, int(num_solu.rstrip("+")), solu.strip(),
+                 method, at_least)
 
             count += 1
 
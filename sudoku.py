@@ -11,44 +11,77 @@ Sudoku
 # (3) Validate that the board is actually solveable (solve)
 # (4) Play! Let player input coords and symbols to make moves
 #       (a) Verify if moves are valid (empty or non-starting cells)
-#       (b) Check if board is full
-#       (c) Once full, check if board is solved (all entries are valid)
-#               *This version allows for multiple solutions, so must
-#               check if full board is solution
+#       (b) Keep count of the tiles in each row, column and zone as
+#           moves are made (see playstate.py), marking repeated tiles
+#       (c) Once full, check if board is solved (no repeated tiles)
+#               *Unless the player asks for a unique puzzle, boards
+#               may have multiple solutions, so must check if full
+#               board is solution
 
 
-from typing import Dict, List, Optional, Set, Text, Tuple, Union
-Board = List[List[Optional[Text]]]
-import random
+from typing import List, Optional, Set, Text, Tuple
+import argparse
 import string
-import copy
+import sys
+from constraints import iter_values
+from engine import Board, Game, generate_batch
+from grading import BANDS
+from render import Renderer
 
 
-class Sudoku:
+class Sudoku(Game):
     """
-    Class representing a Sudoku Board.
+    Class representing a Sudoku Board, played in the terminal
+    (the making, solving and playing itself is done by Game,
+    in engine.py).
     """
-    def __init__(self) -> None:
+    def __init__(self,
+                 interactive: bool =True
+                ) -> None:
         """
         Set defaults, and then call new_game()
         to customize, initiate, and start new game.
-        """
-        self.default_tile_set = 'N'
-        self.default_size = 9
-        self.valid_sizes = {
-                            4:  2,
-                            9:  3,
-                            16: 4
-                            # 25: 5         # takes too long
-                           }
-        self.default_start_counts = {
-                                     4 : 4,     # known min start
-                                     9 : 17,    # known min start
-                                     16: 85     # unknown min start
-                                                # (smaller nums take longer)
-                                     # 25: 132  # unknown min start
-                                    }
-        self.new_game()
+        If interactive is False, only set defaults (call
+        set_up_game() and make_boards() to make a puzzle
+        without any input or output).
+        """
+        super().__init__()
+        self.default_pencil_marks = False
+        # Seconds new_game() lets make_boards() run before giving
+        # the player the choice of trying again or changing the game
+        self.new_game_timeout = 30.0
+        # Whether the playing board is printed with the candidates
+        # of each empty cell (see candidates())
+        self.pencil_marks = self.default_pencil_marks
+        # Whether the playing board is redrawn in place on the
+        # screen (with ANSI codes), rather than printed again
+        self.ansi = False
+        if interactive:
+            self.new_game()
+
+    def set_up_game(self,
+                    size: int,
+                    how_many_start_tiles: int,
+                    tile_set: Text ='N',
+                    unique: bool =False,
+                    difficulty: Optional[Text] =None
+                   ) -> None:
+        """
+        Set up a game as Game.set_up_game() does, along with
+        the renderer and tile texts for printing its boards.
+        """
+        super().set_up_game(size, how_many_start_tiles, tile_set, unique,
+                            difficulty)
+        # How each tile is printed: as entered, as a starting
+        # tile, and when repeated in a row, column or zone
+        self.tile_texts = {
+                           tile: (('  ' + tile + ' ').ljust(5),
+                                  (' [' + tile + ']').ljust(5),
+                                  (' *' + tile + ' ').ljust(5))
+                           for tile in self.tiles
+                          }
+        # Draws the boards, keeping the frame between prints
+        self.renderer = Renderer(self.size, self.zone_size)
 
     def customize_new_game(self) -> None:
         """
@@ -69,10 +102,16 @@ class Sudoku:
         """
         # Board size
         self.get_board_size_input()
+        # Unique solution (which limits the starting tiles)
+        self.get_unique_input()
         # How many starting tiles
         self.get_how_many_starting_tiles_input()
         # Tile set
         self.get_tile_set_input()
+        # Difficulty band
+        self.get_difficulty_input()
+        # Candidates shown in empty cells
+        self.get_pencil_marks_input()
 
     def get_board_size_input(self) -> None:
         """
@@ -98,10 +137,14 @@ class Sudoku:
         """
         Get number of starting tiles for new game from user
         input, and use to overwrite self.how_many_start_tiles.
+        A puzzle with one solution needs at least
+        min_start_counts starting tiles.
         """
         valid_starting_num = False
         max_start_tiles = self.size * self.size
-        min_start_tiles = self.default_start_counts[self.size] - 1
+        min_start_tiles = 0
+        if self.unique:
+            min_start_tiles = self.min_start_counts[self.size] - 1
         print('How many starting tiles would you like?')
         while not valid_starting_num:
             print('Number of starting tiles must be less than ' +
@@ -110,9 +153,6 @@ class Sudoku:
                   str(min_start_tiles) +
                   '.'
                  )
-            if self.size == 16:
-                print('     Warning:  16 x 16 boards might be slow to generate, but boards')
-                print('     with more starting tiles (>130) should generate faster.')
             how_many_start_tiles = input()
             try:
                 how_many_start_tiles = int(how_many_start_tiles)
@@ -125,28 +165,108 @@ class Sudoku:
 
     def get_tile_set_input(self) -> None:
         """
-        Get which tile set to use in new game ('N' or 'L')
+        Get which tile set to use in new game ('N', 'L' or 'S')
         from user input, and overwrite self.tile_set.
+        Letters only go up to 26, so are not offered for
+        bigger boards.
         """
+        tile_sets = ['N', 'L', 'S']
+        if self.size > len(string.ascii_uppercase):
+            tile_sets.remove('L')
         valid_tile_set = False
-        print('Would you like to use number or letter tiles?')
+        print('Would you like to use number, letter or symbol tiles?')
         while not valid_tile_set:
-            print('Enter \'N\' for numbers or \'L\' for letters:')
+            if 'L' in tile_sets:
+                print('Enter \'N\' for numbers, \'L\' for letters, or')
+            else:
+                print('Enter \'N\' for numbers, or')
+            print('\'S\' for one character symbols (1-9, then A-Z):')
             tile_set = input()
-            if tile_set.upper() == 'N' or tile_set.upper() == 'L':
+            if tile_set.upper() in tile_sets:
                 valid_tile_set = True
         self.tile_set = tile_set.upper()
 
+    def get_unique_input(self) -> None:
+        """
+        Ask user if the puzzle must have exactly one
+        solution, and overwrite self.unique.
+        """
+        print('Would you like a puzzle with only one solution?  (Y/N)')
+        unique = input()
+        while unique.upper() != 'Y' and unique.upper() != 'N':
+            print('     Please enter \'Y\' for yes or \'N\' for no.')
+            unique = input()
+        if unique.upper() == 'Y':
+            print('     Note:  Puzzles with only one solution need at least ' +
+                  str(self.min_start_counts[self.size]) + ' starting tiles.')
+            if self.size >= 16:
+                print('     Warning:  ' + str(self.size) + ' x ' + str(self.size) +
+                      ' puzzles with only one solution')
+                print('     might take a while to generate.')
+        self.unique = unique.upper() == 'Y'
+
+    def get_difficulty_input(self) -> None:
+        """
+        Ask user for a difficulty band (or any difficulty),
+        and overwrite self.difficulty.
+        """
+        bands = list(BANDS)
+        print('What difficulty would you like?  (' + ', '.join(bands) +
+              ', or press enter for any)')
+        difficulty = input().strip().lower()
+        while difficulty and difficulty not in bands:
+            print('     Please enter one of ' + ', '.join(bands) +
+                  ', or nothing for any.')
+            difficulty = input().strip().lower()
+        if difficulty:
+            print('     Note:  Puzzles are made and graded until one is ' +
+                  difficulty + ',')
+            print('     so bands that need few or many starting tiles')
+            print('     can take a while (or fail) to generate.')
+        self.difficulty = difficulty or None
+
+    def get_pencil_marks_input(self) -> None:
+        """
+        Ask user if empty cells should show the tiles that
+        could go in them, and overwrite self.pencil_marks.
+        """
+        print('Would you like pencil marks in empty cells?  (Y/N)')
+        pencil_marks = input()
+        while pencil_marks.upper() != 'Y' and pencil_marks.upper() != 'N':
+            print('     Please enter \'Y\' for yes or \'N\' for no.')
+            pencil_marks = input()
+        self.pencil_marks = pencil_marks.upper() == 'Y'
+
+    def get_retry_input(self) -> None:
+        """
+        After a puzzle could not be made, ask user to try
+        again as is, or to change the uniqueness, number of
+        starting tiles and difficulty band.
+        """
+        print('Enter \'R\' to try again, or \'C\' to change the uniqueness,')
+        print('starting tiles and difficulty:')
+        retry = input()
+        while retry.upper() != 'R' and retry.upper() != 'C':
+            print('     Please enter \'R\' to retry or \'C\' to change.')
+            retry = input()
+        if retry.upper() == 'C':
+            self.get_unique_input()
+            self.get_how_many_starting_tiles_input()
+            self.get_difficulty_input()
+
     def new_game(self) -> None:
         """
         Initiate a new game, with size, zone size, number of
-        starting tiles, a tile set, an empty_board, a temp_board,
+        starting tiles, a tile set, an empty_board,
         a solution_board, a starting_board, and a playing_board.
         """
         # Start with default values
         self.size = self.default_size
         self.how_many_start_tiles = self.default_start_counts[self.size]
         self.tile_set = self.default_tile_set
+        self.unique = self.default_unique
+        self.difficulty = self.default_difficulty
+        self.pencil_marks = self.default_pencil_marks
 
         # Print the title for game
         self.print_title()
@@ -154,48 +274,27 @@ class Sudoku:
         # Allow player to change defaults
         self.customize_new_game()
 
-        # Make your set of tiles
-        self.tiles = self.make_tile_set()
-
-        # Determine correct zone size
-        self.zone_size = self.valid_sizes[self.size]
-
-        # Make an empty board
-        self.empty_board = [
-                            [None for i in range(self.size)]
-                            for j in range(self.size)
-                           ]
-
-        # Empty cells on playing board (determined when starting board is made)
-        self.playing_board_empties = set([i for i in range(self.size)])
-
-        # Temp board used for solving
-        self.temp_board = copy.deepcopy(self.empty_board)
-        # Answer board
-        self.solution_board = self.fill_board()
-
-        # Starting puzzle board
-        self.starting_board = self.make_start_board(self.how_many_start_tiles)
-        # Playing board
-        self.playing_board = copy.deepcopy(self.starting_board)
+        # Set up and make the boards, until a puzzle is made in
+        # time (and in the difficulty band, if one was chosen)
+        while True:
+            self.set_up_game(self.size,
+                             self.how_many_start_tiles,
+                             self.tile_set,
+                             self.unique,
+                             self.difficulty)
+            try:
+                self.make_boards(timeout=self.new_game_timeout)
+                break
+            except TimeoutError:
+                print('     No puzzle was made in ' +
+                      str(self.new_game_timeout) + ' seconds.')
+            except RuntimeError as error:
+                print('     Sorry, ' + str(error) + '.')
+            self.get_retry_input()
 
         # Start playing!
         self.play_game()
 
-    def make_tile_set(self) -> List[Text]:
-        """
-        Make a set of tiles (letters or numbers)
-        that is the correct length (self.size).
-        """
-        # Using alpha letters
-        if self.tile_set.upper() == 'L':
-            tiles_itr = string.ascii_uppercase
-        # Using numerals (default)
-        else:
-            tiles_itr = [str(i) for i in range(1, self.size + 1)]
-        # Crop to match size, return set
-        return list(tiles_itr[:self.size])
-
     def print_solution_board(self) -> Text:
         """
         Print the solution board.
@@ -210,92 +309,74 @@ class Sudoku:
 
     def print_playing_board(self) -> Text:
         """
-        Print the playing board.
+        Print the playing board, marking tiles that
+        are repeated in a row, column or zone, and with
+        pencil marks if self.pencil_marks is set (in place
+        on the screen if self.ansi is set).
         """
-        return self.print_board(self.playing_board)
-
-    def print_temp_board(self) -> Text:
-        """
-        Print the temp board.
-        """
-        return self.print_board(self.temp_board)
+        conflicts = None
+        candidates = None
+        if self.play_state is not None:
+            conflicts = set(self.play_state.conflicting_cells())
+            if self.pencil_marks:
+                candidates = self.play_state.cands
+        return self.print_board(self.playing_board, conflicts, candidates,
+                                self.ansi)
 
     def print_board(self,
-                    board: Board
+                    board: Board,
+                    conflicts: Optional[Set[int]] =None,
+                    candidates: Optional[List[int]] =None,
+                    in_place: bool =False
                    ) -> Text:
         """
-        Print a given board to the terminal.
-        """
-        thick_vert = '|'
-        thin_vert =  ':'
-        thick_horz = '-----'
-        thin_horz =  ' . . '
-        starting_tile_emp_left = '['
-        starting_tile_emp_right = ']'
-
-        out = '     '
-        # Column number labels
-        for col in range(self.size):
-            if col > 9:
-                out += '  ' + str(col) + '  '
-            else:
-                out += '   ' + str(col) + '  '
-        out += '\n'
-        # Rows
-        for row in range(self.size):
-            # Horizontal border row
-            out += '     '
-            for c in range(self.size):
-                if c % self.zone_size == 0:
-                    out += thick_vert
-                else:
-                    out += thin_vert
-                if row % self.zone_size == 0:
-                    out += thick_horz
+        Print a given board to the terminal.  Tiles in
+        conflicts (flat indexes, if given) are marked with *.
+        If given, candidates (a mask for each flat index) are
+        shown in empty cells as pencil marks, padded with '.',
+        or counted, as '(n)', if too many to fit.
+        Only the cells that changed since the last board are
+        rewritten (see render.py), and if in_place is True only
+        those are printed, drawn over the board on the screen.
+        """
+        renderer = self.renderer
+        row_of, col_of = self.layout.row_of, self.layout.col_of
+        starting = self.starting_cells
+        for i in range(self.size * self.size):
+            tile = board[row_of[i]][col_of[i]]
+            if tile is not None:
+                # Starting tiles in brackets, repeated tiles marked
+                if i in starting:
+                    text = self.tile_texts[tile][1]
+                elif conflicts and i in conflicts:
+                    text = self.tile_texts[tile][2]
                 else:
-                    out += thin_horz
-            out += thick_vert + '\n'
-
-            # Row number label
-            if row > 9:
-                out += ' ' + str(row) + '  '
+                    text = self.tile_texts[tile][0]
+            elif candidates is not None:
+                text = self.pencil_mark_text(candidates[i])
             else:
-                out += '  ' + str(row) + '  '
-
-            # Row contents
-            for c in range(self.size):
-                if c % self.zone_size == 0:
-                    out += thick_vert
-                else:
-                    out += thin_vert
-                # Cell contents
-                if board[row][c] is not None:
-                    tile = board[row][c]
-                    # If a starting tile
-                    if self.starting_board[row][c] is not None:
-                        out += (' ' +
-                                starting_tile_emp_left +
-                                tile +
-                                starting_tile_emp_right
-                               )
-                    else:
-                        out += '  ' + tile + ' '
-                    if len(tile) == 1:
-                        out += ' '
-                else:
-                    out += '     '
-            out += thick_vert + '\n'
-        # Bottom border
-        out += '     '
-        for c in range(self.size):
-            if c % self.zone_size == 0:
-                out += thick_vert
-            else:
-                out += thin_vert
-            out += thick_horz
-        out += thick_vert + '\n'
-        print(out)
-        return out
+                text = '     '
+            renderer.set(i, text)
+        if in_place:
+            renderer.redraw()
+            return renderer.text()
+        return renderer.write()
+
+    def pencil_mark_text(self,
+                         mask: int
+                        ) -> Text:
+        """
+        The 5 characters showing a cell's candidates (mask):
+        the tiles if they fit, otherwise how many there are.
+        """
+        tiles = [self.tiles[v - 1] for v in iter_values(mask)]
+        if all(len(tile) == 1 for tile in tiles):
+            text = ''.join(tiles)
+        else:
+            text = ','.join(tiles)
+        if len(text) > 5:
+            text = '(' + str(len(tiles)) + ')'
+        return text.center(5, '.')
 
     def print_title(self) -> None:
         """
@@ -313,274 +394,6 @@ class Sudoku:
         print(sp_6 + vert + horz + vert)
         print()
 
-    def get_zone_order(self) -> List[Tuple[int, int]]:
-        """
-        Determine the order in which to search zones.
-        (Used with fill_board_by_zones, in progress)
-        """
-        order = []
-        end = self.zone_size
-        mid = self.zone_size // 2 + 1
-        for i in range(mid):
-            order.append((i, i))
-            if end - i - 1 != i:
-                order.append((end - i - 1, end - i - 1))
-            for j in range(i):
-                order.append((i, j))
-                order.append((j, i))
-                order.append((end - i - 1, end - j - 1))
-                order.append((end - j - 1, end - i - 1))
-
-        return order
-
-    def fill_board_by_zones(self) -> bool:
-        """
-        Attempting to fill the board in a 'smarter'
-        way, but does not work yet...
-        """
-        # (filling zones in linear order:)
-        # for z_row in range(self.zone_size):
-        #     for z_col in range(self.zone_size):
-        #       ...
-
-        # Solve zones working out from starting corners,
-        # along the outer sides and across the corner-corner diagonal:
-        zone_order = self.get_zone_order()
-        print(zone_order)
-
-        for z_row, z_col in zone_order:
-            start_row = z_row * self.zone_size
-            end_row = start_row + self.zone_size
-            start_col = z_col * self.zone_size
-            end_col = start_col + self.zone_size
-            zone_solved = self.solve_zone(start_row, end_row, start_col, end_col, start_row, start_col)
-
-            if not zone_solved:
-                break
-
-        return zone_solved
-
-    def fill_board(self) -> Board:
-        """
-        Fill the temp board with a valid solution.
-        Starts by filling two started zones, and then
-        calls solve_board() to recursively fill the remainder.
-        Required: Board to fill must be copied to self.temp_board
-                  before calling this function.
-        """
-        solvable = False
-        while not solvable:
-            # Copy the empty board
-            self.temp_board = copy.deepcopy(self.empty_board)
-
-            # Start by filling two opposite zones
-            self.fill_two_starter_zones()
-
-            # (attempting to fill by zone...)
-
-            # Fill (solve) the rest of the board
-            solvable = self.solve_board()
-
-        # Board is solvable and filled, return temp board
-        return self.temp_board
-
-    def fill_two_starter_zones(self) -> None:
-        """
-        Fill the first two corner zones on temp board,
-        which have no shared rows or columns.
-        Called by fill_board().
-        Required: Board to fill must be copied to self.temp_board
-                  before calling this function.
-        """
-        # Fill top left zone on temp board
-        start = 0
-        end = self.zone_size
-        self.fill_starter_zone(start, end)
-
-        # Fill bottom right zone on temp board
-        start = self.size - self.zone_size
-        end = self.size
-        self.fill_starter_zone(start, end)
-
-    def fill_starter_zone(self,
-                          start: int,
-                          end: int
-                         ) -> None:
-        """
-        Fill one of the two starter corner zones.
-        Called by fill_two_starter_zones().
-        Required: Board to fill must be copied to self.temp_board
-                  before calling this function.
-        """
-        # Make a list of tiles, random shuffle
-        tiles = list(copy.deepcopy(self.tiles))
-        random.shuffle(tiles)
-        # Enter tiles into zone:
-        for r in range(start, end):
-            for c in range(start, end):
-                # Fill in zone on temp board
-                self.temp_board[r][c] = tiles.pop()
-
-    def solve_zone(self,
-                   start_row: int,
-                   end_row: int,
-                   start_col: int,
-                   end_col: int,
-                   row: int,
-                   col: int,
-                  ) -> bool:
-        """
-        Recursively solve a single zone in temp board,
-        return True if solvable, else return False.
-        (Called by fill_board_by_zone, still in progress.)
-        Note:     Zone range is not inclusive -- end_row and
-                  end_col are not included in the current zone.
-        Required: Board to solve must be copied to self.temp_board
-                  before calling this function.
-        """
-        # If end of row reached:
-        if col == end_col:
-            # Next row:
-            row += 1
-            col = start_col
-            # If end of row reached:
-            if row == end_row:
-                return True
-
-        # If cell already filled:
-        if self.temp_board[row][col] is not None:
-            return self.solve_zone(start_row, end_row, start_col, end_col, row, col + 1)
-
-        # Choose a tile, check if safe, insert tile if safe
-        for tile in self.tiles:
-            if self.check_if_valid_entry(row, col, tile):
-                self.temp_board[row][col] = tile
-                # Recursively fill zone
-                if self.solve_zone(start_row, end_row, start_col, end_col, row, col + 1):
-                    return True
-            # If tile ivalid continue
-            self.temp_board[row][col] = None
-
-        return False
-
-    def solve_board(self,
-                    row: int =0,
-                    col: int =0
-                   ) -> bool:
-        """
-        Recursive function to solve /fill the temp board.
-        Required: Board to solve must be copied to self.temp_board
-                  before calling this function.
-        """
-        # If end of board reached
-        if row == self.size - 1 and col == self.size:
-            return True
-        # If end of row reached
-        if col == self.size:
-            row += 1
-            col = 0
-        # If cell already filled
-        if self.temp_board[row][col] is not None:
-            return self.solve_board(row, col + 1)
-        # Choose a tile, check if safe, insert tile
-        for tile in self.tiles:
-            if self.check_if_valid_entry(row, col, tile):
-                self.temp_board[row][col] = tile
-                # Recursively call fill func until all filled
-                if self.solve_board(row, col + 1):
-                    return True
-            # If move invalid continue
-            self.temp_board[row][col] = None
-        # If no more options, return False
-        return False
-
-    def check_if_valid_entry(self,
-                             row: int,
-                             col: int,
-                             entry: Text =None
-                            ) -> bool:
-        """
-        Check if an entry in temp board is valid.
-        Note:  Uses self.temp_board, board being solved
-               /filled must be copied to self.temp_board
-               before calling this function.
-        """
-        # If not entering a new tile
-        if entry is None:
-            entry = self.temp_board[row][col]
-        # Check column
-        for c in range(self.size):
-            if self.temp_board[row][c] == entry:
-                if c != col:
-                    return False
-        # Check row
-        for r in range(self.size):
-            if self.temp_board[r][col] == entry:
-                if r != row:
-                    return False
-        # Check zone
-        start_row = row - row % self.zone_size
-        start_col = col - col % self.zone_size
-        for r in range(start_row, start_row + self.zone_size):
-            for c in range(start_col, start_col + self.zone_size):
-                if self.temp_board[r][c] == entry:
-                    if (r, c) != (row, col):
-                        return False
-        return True
-
-    def make_start_board(self,
-                         how_many_start_tiles: int
-                        ) -> Board:
-        """
-        Remove tiles from copied solution board
-        to make a starting puzzle board.
-        Check if board solvable, and if solvable,
-        set playing_board_empties, and return board.
-        Required:  Solution board must already be created.
-        """
-        solvable = False
-        while not solvable:
-            # Start with solution board copy
-            board = copy.deepcopy(self.solution_board)
-            n = self.size * self.size
-            # Make list of indexes, random shuffle
-            indexes_remaining = [i for i in range(n)]
-            self.playing_board_empties = set(indexes_remaining)
-            random.shuffle(indexes_remaining)
-            # Count how many tiles remaining
-            remaining_tile_count = n
-            # Remove tiles until target num remaining
-            while remaining_tile_count > how_many_start_tiles:
-                i = indexes_remaining.pop()
-                row = i // self.size
-                col = i % self.size
-                board[row][col] = None
-                remaining_tile_count -= 1
-            # Check if start board is solvable
-            # (Save to temp board first)
-            self.temp_board = copy.deepcopy(board)
-            solvable = self.solve_board()
-        # Board is solvable, save which indexes were removed
-        self.playing_board_empties -= set(indexes_remaining)
-        return board
-
-    def is_game_solved(self) -> bool:
-        """
-        Check if playing board is solved, by copying
-        playing board into temp board, and checking
-        if all entries are valid.
-        """
-        # If there are multiple solutions, comparing to solution
-        # board won't work, so need to check for solution
-        self.temp_board = copy.deepcopy(self.playing_board)
-        self.print_temp_board()
-        for index in range(self.size * self.size):
-            row = index // self.size
-            col = index % self.size
-            if not self.check_if_valid_entry(row, col):
-                return False
-        return True
-
     def play_game(self):
         """
         Play the game!
@@ -600,6 +413,10 @@ class Sudoku:
                 # If not solved, continue playing
                 if not solved:
                     print('     Hmmm, that\'s not quite right...')
+            # Point out repeated tiles as soon as they are made
+            elif self.play_state.conflicts:
+                print('     Tiles marked * are repeated in a row, '
+                      'column or zone.')
             # Get the next move:
             if not solved:
                 self.take_move()
@@ -614,13 +431,17 @@ class Sudoku:
 
     def get_row_col_input(self) -> Tuple[int, int]:
         """
-        Get row and column input from the user.
+        Get row and column input from the user
+        (printing a hint whenever they ask for one).
         """
         row = None
         col = None
         while not isinstance(row, int) or not row in range(self.size):
-            print('Please enter a row:      ', end='')
+            print('Please enter a row (or H for a hint):  ', end='')
             row = input()
+            if row.upper() == 'H':
+                self.print_hint()
+                continue
             try:
                 row = int(row)
             except:
@@ -672,29 +493,132 @@ class Sudoku:
             if to_edit.upper() == 'N':
                 row, col = self.get_row_col_input()
             else:
-                # Empty the cell
-                index = row * self.size + col
-                self.playing_board_empties.add(index)
-                self.playing_board[row][col] = None
+                self.erase_move(row, col)
         # Get tile input
         tile = self.get_tile_input()
         self.make_move(row, col, tile)
 
-    def make_move(self,
-                  row: int,
-                  col: int,
-                  tile: Text
-                 ) -> None:
-        """
-        Make the given move by updating the playing
-        board and removing the index from the empties list.
-        """
-        # Enter the selection onto board
-        self.playing_board[row][col] = tile
-        # Remove index from empties set
-        index = row * self.size + col
-        self.playing_board_empties.remove(index)
+    def print_hint(self) -> None:
+        """
+        Print a hint for the playing board.
+        """
+        hint = self.hint()
+        if hint is None:
+            print('     No hint needed, the board is solved!')
+            return
+        row, col, tile, technique = hint
+        if technique == 'mistake':
+            print('     Cell (' + str(row) + ', ' + str(col) +
+                  ') should be ' + tile + '.')
+        elif technique == 'solution':
+            print('     Try ' + tile + ' in cell (' + str(row) + ', ' +
+                  str(col) + ') (no logical step found).')
+        else:
+            print('     ' + tile + ' goes in cell (' + str(row) + ', ' +
+                  str(col) + '), by ' + technique.replace('_', ' ') + '.')
+
+
+def main(argv: Optional[List[Text]] =None) -> None:
+    """
+    Play a game (the default), or generate a batch of
+    puzzles with 'generate'.
+    """
+    parser = argparse.ArgumentParser(prog='sudoku',
+                                     description='Generate, solve, and play Sudoku.')
+    commands = parser.add_subparsers(dest='command')
+    play = commands.add_parser('play',
+                               help='play a game in the terminal (default)')
+    play.add_argument('--ansi', action='store_true',
+                      help='redraw the board in place with ANSI codes, '
+                           'only rewriting the cells that changed')
+    generate = commands.add_parser('generate',
+                                   help='generate puzzles without a terminal '
+                                        'session, one clues:count:solution '
+                                        'line per puzzle')
+    generate.add_argument('--size', type=int, default=9,
+                          choices=[4, 9, 16, 25, 36])
+    generate.add_argument('--clues', type=int, default=None,
+                          help='starting tiles per puzzle '
+                               '(default: the known minimum for the size)')
+    generate.add_argument('--count', type=int, default=1,
+                          help='how many puzzles to generate')
+    generate.add_argument('--workers', type=int, default=1,
+                          help='worker processes (default: 1)')
+    generate.add_argument('--unique', action='store_true',
+                          help='only make puzzles with one solution')
+    generate.add_argument('--count-limit', type=int, default=2,
+                          help='stop counting solutions at this many, '
+                               'written as a lower bound such as 2+, '
+                               '0 to count them all (default: 2)')
+    generate.add_argument('--fill', default='mrv',
+                          choices=['mrv', 'zones', 'pattern'],
+                          help='how to fill solutions: most constrained '
+                               'cell first, zone by zone, or by shuffling '
+                               'a pattern solution (no search, fastest) '
+                               '(default: mrv)')
+    generate.add_argument('--difficulty', default=None,
+                          choices=list(BANDS),
+                          help='only keep puzzles graded in this band, '
+                               'by the hardest technique they need '
+                               '(default: any)')
+    generate.add_argument('--restarts', default='luby',
+                          choices=['luby', 'none'],
+                          help='when to start filling a solution over: '
+                               'after a growing (Luby) number of nodes, or '
+                               'only once it is stuck (default: luby)')
+    generate.add_argument('--timeout', type=float, default=None,
+                          help='seconds allowed per puzzle, after which '
+                               'generating stops with an error')
+    generate.add_argument('--max-nodes', type=int, default=None,
+                          help='nodes allowed for filling each solution, '
+                               'after which generating stops with an error')
+    generate.add_argument('--seed', default=None,
+                          help='seed, for repeatable batches')
+    generate.add_argument('--chunk-size', type=int, default=50,
+                          help='puzzles per task handed to a worker')
+    generate.add_argument('--output', default=None,
+                          help='file to write to (default: stdout)')
+    args = parser.parse_args(argv)
+
+    if args.command != 'generate':
+        game = Sudoku(interactive=False)
+        game.ansi = args.command == 'play' and args.ansi
+        game.new_game()
+        return
+
+    game = Sudoku(interactive=False)
+    clues = args.clues
+    if clues is None:
+        clues = game.default_start_counts[args.size]
+    if not 0 < clues <= args.size * args.size:
+        parser.error('--clues must be between 1 and ' +
+                     str(args.size * args.size))
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        rate = generate_batch(args.size,
+                              clues,
+                              args.count,
+                              max(1, args.workers),
+                              args.unique,
+                              args.count_limit or None,
+                              args.seed,
+                              max(1, args.chunk_size),
+                              out,
+                              args.fill,
+                              args.difficulty,
+                              args.timeout,
+                              args.max_nodes,
+                              None if args.restarts == 'none' else args.restarts)
+    except (RuntimeError, TimeoutError) as error:
+        parser.exit(1, 'sudoku generate: ' + str(error) + '\n')
+    finally:
+        if args.output:
+            out.close()
+    print('generated ' + str(args.count) + ' puzzles, ' +
+          '{:.1f} puzzles/sec, '.format(rate) +
+          '{:.1f} puzzles/sec per worker'.format(rate / max(1, args.workers)),
+          file=sys.stderr)
 
 
 if __name__ == '__main__':
-    game = Sudoku()
+    main()